@@ -1,31 +1,78 @@
-from fastapi import APIRouter, HTTPException, Query, Cookie, Header
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
 from typing import List, Optional
 from datetime import datetime, timezone
 import uuid
 from enhanced_models import *
+from auth import require_admin
+from catalog_cache import catalog
+from inventory import flash_sale
+from product_import import import_products, iter_csv_rows, iter_jsonl_rows, iter_lines
+from schema_version import parse_legacy_datetimes
 import os
 
 # This will be initialized from main server.py
 db = None
 
-router = APIRouter(prefix="/api/admin", tags=["admin"])
+router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin)])
 
 def init_db(database):
     global db
     db = database
 
+# ============ BULK PRODUCT IMPORT ============
+
+@router.post("/products/import")
+async def import_products_bulk(
+    request: Request,
+    format: Optional[str] = Query(None, regex="^(csv|jsonl)$"),
+    dry_run: bool = False
+):
+    """Create or update products from a streamed CSV or JSONL body
+    
+    Rows with a product_id update that product; other rows upsert on (name, category).
+    CSV list cells (images, tags) are separated by "|". dry_run=true only validates.
+    """
+    if not format:
+        content_type = request.headers.get("content-type", "")
+        if "csv" in content_type:
+            format = "csv"
+        elif "json" in content_type:
+            format = "jsonl"
+        else:
+            raise HTTPException(status_code=400, detail="Send text/csv or application/x-ndjson, or pass format=csv|jsonl")
+    
+    # Rows may set stock on flash-sale products (matched by product_id or by name and category),
+    # which the in-memory counters have not seen: write their holds first, reload them after
+    flash_products = bool(flash_sale.product_ids) and not dry_run
+    if flash_products:
+        await flash_sale.flush(db)
+    
+    lines = iter_lines(request.stream())
+    rows = iter_csv_rows(lines) if format == "csv" else iter_jsonl_rows(lines)
+    try:
+        report = await import_products(db.products, rows, dry_run=dry_run)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Import body must be UTF-8")
+    
+    if report.inserted or report.updated:
+        # Without change streams the snapshot would otherwise wait for the next poll
+        if catalog.mode != "change_stream":
+            await catalog.load(db)
+        await catalog.bump_version(db)
+        if flash_products:
+            await flash_sale.load(db)
+    
+    return report.to_dict()
+
 # ============ CATEGORIES MANAGEMENT ============
 
 @router.get("/categories")
 async def get_categories():
     """Get all categories with subcategories"""
     categories = await db.categories.find({}, {"_id": 0}).to_list(1000)
-    for cat in categories:
-        if isinstance(cat['created_at'], str):
-            cat['created_at'] = datetime.fromisoformat(cat['created_at'])
-        if isinstance(cat['updated_at'], str):
-            cat['updated_at'] = datetime.fromisoformat(cat['updated_at'])
+    parse_legacy_datetimes(categories, 'created_at', 'updated_at')
     return categories
 
 @router.post("/categories")
@@ -44,6 +91,7 @@ async def create_category(category: CategoryCreate):
     })
     
     await db.categories.insert_one(category_data.copy())
+    await catalog.bump_version(db)
     return Category(**category_data)
 
 @router.put("/categories/{category_id}")
@@ -52,15 +100,16 @@ async def update_category(category_id: str, category: CategoryUpdate):
     update_data = {k: v for k, v in category.model_dump().items() if v is not None}
     update_data["updated_at"] = datetime.now(timezone.utc)
     
-    result = await db.categories.update_one(
+    updated = await db.categories.find_one_and_update(
         {"category_id": category_id},
-        {"$set": update_data}
+        {"$set": update_data},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
     )
     
-    if result.matched_count == 0:
+    if not updated:
         raise HTTPException(status_code=404, detail="Category not found")
-    
-    updated = await db.categories.find_one({"category_id": category_id}, {"_id": 0})
+    await catalog.bump_version(db)
     return updated
 
 @router.delete("/categories/{category_id}")
@@ -69,6 +118,7 @@ async def delete_category(category_id: str):
     result = await db.categories.delete_one({"category_id": category_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Category not found")
+    await catalog.bump_version(db)
     return {"message": "Category deleted successfully"}
 
 # ============ ADVANCED ORDER FILTERING ============
@@ -113,11 +163,7 @@ async def filter_orders(
     
     orders = await db.orders.find(query, {"_id": 0}).sort("created_at", -1).limit(limit).to_list(limit)
     
-    for order in orders:
-        if isinstance(order['created_at'], str):
-            order['created_at'] = datetime.fromisoformat(order['created_at'])
-        if isinstance(order['updated_at'], str):
-            order['updated_at'] = datetime.fromisoformat(order['updated_at'])
+    parse_legacy_datetimes(orders, 'created_at', 'updated_at')
     
     return {
         "orders": orders,
@@ -132,11 +178,7 @@ async def get_customer_orders(user_id: str):
     """Get all orders for a specific customer"""
     orders = await db.orders.find({"user_id": user_id}, {"_id": 0}).sort("created_at", -1).to_list(1000)
     
-    for order in orders:
-        if isinstance(order['created_at'], str):
-            order['created_at'] = datetime.fromisoformat(order['created_at'])
-        if isinstance(order['updated_at'], str):
-            order['updated_at'] = datetime.fromisoformat(order['updated_at'])
+    parse_legacy_datetimes(orders, 'created_at', 'updated_at')
     
     # Get customer info
     user = await db.users.find_one({"user_id": user_id}, {"_id": 0})
@@ -0,0 +1,185 @@
+"""
+Authentication for House of Neelam
+Session issuance/resolution and the FastAPI auth dependencies shared by all routers
+"""
+
+from fastapi import Depends, HTTPException, Request, Response, Cookie, Header
+from pydantic import BaseModel, ConfigDict
+from typing import Dict, Optional
+from datetime import datetime, timezone, timedelta
+from dotenv import load_dotenv
+from pathlib import Path
+import asyncio
+import logging
+import os
+import uuid
+
+from session_cache import SessionCache
+from session_tokens import RevocationList, is_signed_token, sign_session_token, verify_session_token, user_doc_from_payload
+
+logger = logging.getLogger(__name__)
+
+load_dotenv(Path(__file__).parent / '.env')
+
+# This will be initialized from main server.py
+db = None
+
+def init_auth(database):
+    global db
+    db = database
+
+# Session -> user cache (avoids the session + user lookups on hot requests)
+session_cache = SessionCache(
+    max_size=int(os.environ.get('SESSION_CACHE_SIZE', '10000')),
+    ttl_seconds=float(os.environ.get('SESSION_CACHE_TTL', '60'))
+)
+
+# Session tokens: "opaque" (looked up in db.user_sessions) or "signed" (stateless HMAC tokens)
+SESSION_TOKEN_MODE = os.environ.get('SESSION_TOKEN_MODE', 'opaque')
+SESSION_SIGNING_SECRET = os.environ.get('SESSION_SIGNING_SECRET')
+if SESSION_TOKEN_MODE == 'signed' and not SESSION_SIGNING_SECRET:
+    raise RuntimeError("SESSION_SIGNING_SECRET is required when SESSION_TOKEN_MODE=signed")
+REVOCATION_SYNC_INTERVAL = float(os.environ.get('REVOCATION_SYNC_INTERVAL', '15'))
+SESSION_TTL = timedelta(days=7)
+revocation_list = RevocationList()
+
+class User(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    user_id: str
+    email: str
+    name: str
+    picture: Optional[str] = None
+    role: str = "customer"
+    phone: Optional[str] = None
+    created_at: datetime
+
+# ============ SESSION RESOLUTION ============
+
+async def get_current_user(authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)) -> Optional[User]:
+    """Extract user from session_token (cookie first, then Authorization header)"""
+    token = session_token or (authorization.replace('Bearer ', '') if authorization else None)
+    if not token:
+        return None
+
+    if is_signed_token(token):
+        if not SESSION_SIGNING_SECRET:
+            return None
+        payload = verify_session_token(SESSION_SIGNING_SECRET, token)
+        if not payload or revocation_list.is_revoked(payload["jti"]):
+            return None
+        return User(**user_doc_from_payload(payload))
+
+    cached_user = session_cache.get(token)
+    if cached_user:
+        return cached_user
+
+    session = await db.user_sessions.find_one({"session_token": token}, {"_id": 0})
+    if not session:
+        return None
+
+    expires_at = session["expires_at"]
+    if isinstance(expires_at, str):
+        expires_at = datetime.fromisoformat(expires_at)
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    now = datetime.now(timezone.utc)
+    if expires_at < now:
+        return None
+
+    # Sessions carry a user snapshot; legacy sessions without one fall back to a users lookup
+    user_doc = session.get("user")
+    if not user_doc:
+        user_doc = await db.users.find_one({"user_id": session["user_id"]}, {"_id": 0})
+        if not user_doc:
+            return None
+        await db.user_sessions.update_one(
+            {"session_token": token},
+            {"$set": {"user": session_user_snapshot(user_doc)}}
+        )
+
+    if isinstance(user_doc['created_at'], str):
+        user_doc['created_at'] = datetime.fromisoformat(user_doc['created_at'])
+
+    user = User(**user_doc)
+    session_cache.set(token, user, max_age=(expires_at - now).total_seconds())
+    return user
+
+# ============ DEPENDENCIES ============
+
+async def current_user(
+    request: Request,
+    authorization: Optional[str] = Header(None),
+    session_token: Optional[str] = Cookie(None)
+) -> Optional[User]:
+    """Optional user, resolved at most once per request"""
+    if not hasattr(request.state, "user"):
+        request.state.user = await get_current_user(authorization, session_token)
+    return request.state.user
+
+async def require_user(user: Optional[User] = Depends(current_user)) -> User:
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return user
+
+async def require_admin(user: Optional[User] = Depends(current_user)) -> User:
+    if not user or user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return user
+
+# ============ SESSION LIFECYCLE ============
+
+def session_user_snapshot(user_doc: Dict) -> Dict:
+    """Copy of the users fields stored on a session so auth resolves in one query"""
+    return {field: user_doc.get(field) for field in User.model_fields}
+
+async def create_session(response: Response, user_doc: Dict, session_token: Optional[str] = None) -> str:
+    """Issue a session for a users document and set the session cookie"""
+    if SESSION_TOKEN_MODE == 'signed':
+        session_token = sign_session_token(SESSION_SIGNING_SECRET, user_doc, SESSION_TTL)
+    else:
+        session_token = session_token or f"session_{uuid.uuid4().hex}"
+        now = datetime.now(timezone.utc)
+        await db.user_sessions.insert_one({
+            "user_id": user_doc["user_id"],
+            "session_token": session_token,
+            "user": session_user_snapshot(user_doc),
+            "expires_at": now + SESSION_TTL,
+            "created_at": now
+        })
+
+    response.set_cookie(
+        key="session_token",
+        value=session_token,
+        httponly=True,
+        secure=True,
+        samesite="none",
+        max_age=int(SESSION_TTL.total_seconds()),
+        path="/"
+    )
+    return session_token
+
+async def end_session(session_token: str):
+    """Revoke a signed token or delete an opaque session"""
+    if is_signed_token(session_token):
+        payload = verify_session_token(SESSION_SIGNING_SECRET, session_token) if SESSION_SIGNING_SECRET else None
+        if payload and not revocation_list.is_revoked(payload["jti"]):
+            await revocation_list.revoke(db, payload)
+    else:
+        session_cache.invalidate(session_token)
+        await db.user_sessions.delete_one({"session_token": session_token})
+
+async def refresh_user_sessions(user_id: str, changes: Dict):
+    """Propagate users-row changes to the session snapshots and drop cached sessions"""
+    await db.user_sessions.update_many(
+        {"user_id": user_id},
+        {"$set": {f"user.{field}": value for field, value in changes.items()}}
+    )
+    session_cache.invalidate_user(user_id)
+
+async def sync_revocations_loop():
+    while True:
+        await asyncio.sleep(REVOCATION_SYNC_INTERVAL)
+        try:
+            await revocation_list.sync(db)
+        except Exception as e:
+            logger.error(f"Revocation list sync error: {str(e)}")
@@ -0,0 +1,132 @@
+"""
+CPU-bound auth work for House of Neelam
+Runs password hashing/verification on a bounded thread pool so it never blocks the event loop,
+and throttles login attempts per client IP
+"""
+
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional
+import asyncio
+import ipaddress
+import time
+
+
+class PoolSaturated(Exception):
+    """Raised when the auth pool already has max_workers + max_queue jobs in flight"""
+
+
+class AuthWorkerPool:
+    """Bounded executor with queue-depth limit and latency metrics"""
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 16, sample_size: int = 1000):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="auth")
+        self._in_flight = 0
+        self._samples = deque(maxlen=sample_size)
+        self.completed = 0
+        self.rejected = 0
+        self.max_latency_ms = 0.0
+
+    async def run(self, fn: Callable, *args) -> Any:
+        if self._in_flight >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise PoolSaturated()
+
+        self._in_flight += 1
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._in_flight -= 1
+            latency_ms = (time.perf_counter() - started) * 1000
+            self._samples.append(latency_ms)
+            self.completed += 1
+            self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        samples = sorted(self._samples)
+
+        def percentile(p: float) -> float:
+            if not samples:
+                return 0.0
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))], 2)
+
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "latency_ms": {
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": round(self.max_latency_ms, 2)
+            }
+        }
+
+
+class TrustedProxies:
+    """Peers (IPs or CIDRs) whose X-Real-IP header names the real client; anyone else could forge it"""
+
+    def __init__(self, networks: Iterable[str]):
+        self.networks = [ipaddress.ip_network(n.strip(), strict=False) for n in networks if n.strip()]
+
+    def client_ip(self, peer: Optional[str], real_ip: Optional[str]) -> str:
+        if not peer:
+            return "unknown"
+        if real_ip:
+            try:
+                address = ipaddress.ip_address(peer)
+            except ValueError:
+                return peer
+            if any(address in network for network in self.networks):
+                return real_ip.strip()
+        return peer
+
+
+class LoginThrottle:
+    """Sliding-window attempt limiter keyed by client IP, bounded in the number of tracked keys"""
+
+    def __init__(self, max_attempts: int = 10, window_seconds: float = 300.0, max_keys: int = 10000):
+        self.max_attempts = max_attempts
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._attempts: "OrderedDict[str, deque]" = OrderedDict()
+        self.throttled = 0
+
+    def hit(self, key: str) -> Optional[float]:
+        """Record an attempt; returns seconds to wait if the key is over its limit, else None"""
+        now = time.monotonic()
+        attempts = self._attempts.get(key)
+        if attempts is None:
+            attempts = self._attempts[key] = deque()
+            while len(self._attempts) > self.max_keys:
+                self._attempts.popitem(last=False)
+        self._attempts.move_to_end(key)
+
+        while attempts and attempts[0] <= now - self.window_seconds:
+            attempts.popleft()
+
+        if len(attempts) >= self.max_attempts:
+            self.throttled += 1
+            return attempts[0] + self.window_seconds - now
+
+        attempts.append(now)
+        return None
+
+    def reset(self, key: str):
+        self._attempts.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_attempts": self.max_attempts,
+            "window_seconds": self.window_seconds,
+            "tracked_clients": len(self._attempts),
+            "throttled": self.throttled
+        }
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Typo-tolerant search: trigram vocabulary memory and misspelled-query latency
+
+Usage (from backend/):
+    python benchmarks/bench_fuzzy.py [products] [extra vocabulary words]
+"""
+
+import os
+import random
+import string
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_search import make_products, latency_ms
+from fuzzy_match import TrigramVocabulary
+from search_index import SearchIndex
+
+MISSPELLED = ["saphire", "neckless", "emrald earings", "diamnd", "braclet", "platnum", "kundun bridel"]
+
+
+def random_words(n, seed=11):
+    rng = random.Random(seed)
+    return {"".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 12))) for _ in range(n)}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    extra = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+
+    # Vocabulary alone: the catalog vocabulary plus a long tail of random words
+    words = random_words(extra)
+    tracemalloc.start()
+    vocabulary = TrigramVocabulary()
+    for word in words:
+        vocabulary.add(word)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"Vocabulary: {len(vocabulary)} terms, {vocabulary.stats()['trigrams']} trigrams, {size / 1e6:.1f} MB")
+
+    # End to end on the product index (catalog vocabulary + long tail)
+    index = SearchIndex()
+    for p in make_products(count):
+        index.add(p["product_id"], p)
+    for word in words:
+        index.vocabulary.add(word)
+
+    print(f"Products: {count}")
+    print(f"{'query':<18}{'expand p50 ms':>15}{'search p50 ms':>15}{'exact p50 ms':>14}  corrections")
+    for query in MISSPELLED:
+        expand, _ = latency_ms(lambda: index.expand_query(query), 30)
+        fuzzy, _ = latency_ms(lambda: index.search(query, limit=20), 30)
+        exact, _ = latency_ms(lambda: index.search(query, limit=20, fuzzy=False), 30)
+        corrections = {t: [a for a, _ in alts if a != t] for t, alts in index.expand_query(query).items()}
+        print(f"{query:<18}{expand:>15.2f}{fuzzy:>15.2f}{exact:>14.2f}  {corrections}")
+
+
+if __name__ == '__main__':
+    main()
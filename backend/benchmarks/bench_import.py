@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Bulk import throughput without the database: streaming parse + ProductCreateEnhanced validation +
+upsert construction, for CSV and JSONL bodies. MongoDB bulk_write time comes on top of this.
+
+Usage (from backend/):
+    python benchmarks/bench_import.py [rows]
+"""
+
+import asyncio
+import csv
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from product_import import import_products, iter_csv_rows, iter_jsonl_rows, iter_lines
+
+COLUMNS = ["name", "description", "price", "images", "category", "subcategory", "stock", "tags", "material"]
+
+
+def make_rows(n):
+    return [{
+        "name": f"Heritage Gold Necklace {i}",
+        "description": "Traditional 22K gold necklace with intricate temple design, handcrafted by artisans.",
+        "price": 1000 + i % 5000,
+        "images": [f"https://images.example.com/{i}/{k}.jpg" for k in range(3)],
+        "category": "Necklaces",
+        "subcategory": "Temple",
+        "stock": i % 20,
+        "tags": ["gold", "temple", "bridal"],
+        "material": "22K gold"
+    } for i in range(n)]
+
+
+def csv_body(rows):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(COLUMNS)
+    for row in rows:
+        writer.writerow([
+            "|".join(row[c]) if isinstance(row[c], list) else row[c] for c in COLUMNS
+        ])
+    return out.getvalue().encode()
+
+
+def jsonl_body(rows):
+    return "".join(json.dumps(row) + "\n" for row in rows).encode()
+
+
+async def chunks(body, size=64 * 1024):
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+
+class NullCollection:
+    """Accepts bulk writes without doing anything"""
+
+    class Result:
+        def __init__(self, n):
+            self.upserted_count = n
+            self.matched_count = 0
+
+    async def bulk_write(self, operations, ordered=True):
+        return self.Result(len(operations))
+
+
+async def run(body, parser):
+    started = time.perf_counter()
+    report = await import_products(NullCollection(), parser(iter_lines(chunks(body))))
+    return time.perf_counter() - started, report
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    rows = make_rows(count)
+    print(f"Rows: {count}")
+    for name, body, parser in (("csv", csv_body(rows), iter_csv_rows), ("jsonl", jsonl_body(rows), iter_jsonl_rows)):
+        elapsed, report = asyncio.run(run(body, parser))
+        assert report.inserted == count and report.failed == 0, report.to_dict()
+        print(f"{name:<6}{len(body) / 1e6:>8.1f} MB{elapsed:>8.2f}s{count / elapsed:>12,.0f} rows/s")
+
+
+if __name__ == '__main__':
+    main()
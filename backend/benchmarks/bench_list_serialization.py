@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Per-row cost of list responses: response_model validation + stdlib JSON vs the trusted orjson path
+
+Usage (from backend/):
+    python benchmarks/bench_list_serialization.py [rows]
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# server.py reads these at import; nothing connects during the benchmark
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'benchmark')
+os.environ.setdefault('RAZORPAY_KEY_ID', 'rzp_test_benchmark')
+os.environ.setdefault('RAZORPAY_KEY_SECRET', 'benchmark')
+
+import orjson
+from pydantic import TypeAdapter
+
+from fast_json import trusted_rows
+from server import Order, Product
+
+
+def make_products(n):
+    now = datetime(2026, 1, 1)
+    return [{
+        "product_id": f"prod_{i:012x}",
+        "name": f"Royal Sapphire Ring {i}",
+        "description": "Exquisite 18K gold ring featuring a stunning blue sapphire centerpiece. " * 3,
+        "price": 1000.0 + i,
+        "images": [f"https://images.example.com/{i}/{k}.jpg" for k in range(3)],
+        "category": "Rings",
+        "stock": i % 20,
+        "created_at": now + timedelta(minutes=i),
+        "updated_at": now + timedelta(minutes=i)
+    } for i in range(n)]
+
+
+def make_orders(n):
+    now = datetime(2026, 1, 1)
+    return [{
+        "order_id": f"order_{i:012x}",
+        "user_id": f"user_{i % 50:012x}",
+        "guest_phone": None,
+        "guest_email": None,
+        "items": [{
+            "product_id": f"prod_{k:012x}",
+            "name": f"Product {k}",
+            "price": 999.0,
+            "quantity": 1 + k % 3,
+            "image": f"https://images.example.com/{k}.jpg"
+        } for k in range(4)],
+        "total_amount": 3996.0,
+        "status": "pending",
+        "payment_status": "pending",
+        "created_at": now + timedelta(minutes=i),
+        "updated_at": now + timedelta(minutes=i)
+    } for i in range(n)]
+
+
+def standard_path(adapter, docs):
+    """What FastAPI does for response_model=List[Model]: validate, dump to JSON mode, json.dumps"""
+    validated = adapter.validate_python(docs)
+    return json.dumps(adapter.dump_python(validated, mode="json")).encode()
+
+
+def fast_path(model, docs):
+    return orjson.dumps(trusted_rows(model, docs), option=orjson.OPT_UTC_Z)
+
+
+def per_row_us(fn, docs, repeat=20):
+    fn()  # warm up
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best / len(docs) * 1e6
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+    print(f"Rows per response: {rows}")
+    print(f"{'model':<10}{'standard µs/row':>18}{'fast µs/row':>14}{'speedup':>10}")
+    for model, docs in ((Product, make_products(rows)), (Order, make_orders(rows))):
+        adapter = TypeAdapter(List[model])
+        assert json.loads(standard_path(adapter, docs)) == json.loads(fast_path(model, docs))
+
+        standard = per_row_us(lambda: standard_path(adapter, docs), docs)
+        fast = per_row_us(lambda: fast_path(model, docs), docs)
+        print(f"{model.__name__:<10}{standard:>18.2f}{fast:>14.2f}{standard / fast:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
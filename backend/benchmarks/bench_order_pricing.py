@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Order pricing latency for 1-, 10- and 50-item carts: a find_one per cart line vs one $in query
+for the whole cart vs the in-memory catalog snapshot.
+Needs a MongoDB (MONGO_URL); works in a throwaway database that is dropped afterwards.
+
+Usage (from backend/):
+    python benchmarks/bench_order_pricing.py [products] [rounds]
+"""
+
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+import pricing
+from catalog_cache import catalog
+from bench_search import make_products
+
+CART_SIZES = (1, 10, 50)
+
+
+async def per_line(db, items):
+    """What a naive implementation does: one round trip per cart line"""
+    table = {}
+    for item in items:
+        product = await db.products.find_one({"product_id": item["product_id"]}, pricing.PRICE_PROJECTION)
+        if product:
+            table[product["product_id"]] = product
+    return pricing.price_items(items, table)
+
+
+async def timed(fn, db, carts):
+    latencies = []
+    for items in carts:
+        started = time.perf_counter()
+        await fn(db, items)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1]
+
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    client = AsyncIOMotorClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017'))
+    db = client[f"bench_pricing_{uuid.uuid4().hex[:8]}"]
+    try:
+        products = [{**p, "price": 500 + i % 4500, "images": [f"https://images.example.com/{i}.jpg"]}
+                    for i, p in enumerate(make_products(count))]
+        await db.products.insert_many([dict(p) for p in products])
+        await db.products.create_index("product_id", unique=True)
+        rng = random.Random(11)
+
+        print(f"Products: {count}  rounds: {rounds}")
+        print(f"{'cart':>6}{'per line p50/p95':>22}{'$in p50/p95':>20}{'snapshot p50/p95':>22}")
+        for size in CART_SIZES:
+            carts = [[{"product_id": p["product_id"], "name": "", "price": 0, "quantity": 1, "image": ""}
+                      for p in rng.sample(products, size)] for _ in range(rounds)]
+            catalog.ready = False
+            naive = await timed(per_line, db, carts)
+            batched = await timed(pricing.price_order, db, carts)
+            await catalog.load(db)
+            snapshot = await timed(pricing.price_order, db, carts)
+            print(f"{size:>6}" + "".join(f"{p50:>12.2f}/{p95:.2f} ms" for p50, p95 in (naive, batched, snapshot)))
+    finally:
+        await client.drop_database(db.name)
+        client.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
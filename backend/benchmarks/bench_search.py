@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Product search latency: BM25 inverted index vs a case-insensitive regex scan over every product
+(the regex scan is the in-process equivalent of the unindexed $regex query it replaces).
+Ranking is synchronous, so the cold index time is also how long a search blocks the event loop;
+repeated queries are served from the result cache until the next product write.
+
+Usage (from backend/):
+    python benchmarks/bench_search.py [products]
+"""
+
+import os
+import random
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import SearchIndex
+
+GEMS = ["sapphire", "ruby", "emerald", "diamond", "pearl", "topaz", "opal", "garnet", "amethyst", "onyx"]
+METALS = ["gold", "silver", "platinum", "rose gold", "white gold"]
+KINDS = ["Ring", "Necklace", "Bracelet", "Earrings", "Pendant", "Anklet", "Bangle"]
+STYLES = ["royal", "heritage", "vintage", "classic", "bridal", "temple", "modern", "minimal", "kundan", "polki"]
+QUERIES = ["sapphire", "gold ring", "vintage pearl necklace", "kundan bridal", "emerald earrings", "platinum"]
+
+
+def make_products(n, seed=7):
+    rng = random.Random(seed)
+    products = []
+    for i in range(n):
+        gem, metal, kind, style = rng.choice(GEMS), rng.choice(METALS), rng.choice(KINDS), rng.choice(STYLES)
+        products.append({
+            "product_id": f"prod_{i:012x}",
+            "name": f"{style.title()} {gem.title()} {kind} {i}",
+            "description": f"Handcrafted {metal} {kind.lower()} set with a {gem} centerpiece. "
+                           f"A {style} design finished by artisans, hallmarked and certified.",
+            "category": kind + "s" if not kind.endswith("s") else kind,
+            "material": metal,
+            "tags": [gem, style, metal]
+        })
+    return products
+
+
+def regex_scan(products, query, limit=20):
+    pattern = re.compile(re.escape(query), re.IGNORECASE)
+    results = []
+    for p in products:
+        if (pattern.search(p["name"]) or pattern.search(p["description"])
+                or pattern.search(p["category"]) or any(pattern.search(t) for t in p["tags"])):
+            results.append(p["product_id"])
+            if len(results) >= limit:
+                break
+    return results
+
+
+def latency_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def cold_search(index, query):
+    index._results.clear()
+    return index.search(query, limit=20)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    products = make_products(count)
+
+    index = SearchIndex()
+    started = time.perf_counter()
+    for p in products:
+        index.add(p["product_id"], p)
+    build = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for p in products[:1000]:
+        index.add(p["product_id"], p)
+    update_us = (time.perf_counter() - started) / 1000 * 1e6
+
+    print(f"Products: {count}  terms: {index.stats()['terms']}")
+    print(f"Index build: {build:.2f}s  single-product update: {update_us:.1f} µs")
+    print("Latency in ms (p50/p95); 'cold' is the event-loop blocking time of an uncached query")
+    print(f"{'query':<26}{'cold':>16}{'cached':>16}{'regex scan':>18}")
+    for query in QUERIES:
+        cold = latency_ms(lambda: cold_search(index, query), 30)
+        cached = latency_ms(lambda: index.search(query, limit=20), 30)
+        # A regex that matches nothing (or only late rows) has to scan every product
+        regex = latency_ms(lambda: regex_scan(products, query + " zz"), 5)
+        print(f"{query:<26}" + "".join(f"{p50:>10.2f}/{p95:<7.2f}" for p50, p95 in (cold, cached, regex)))
+
+
+if __name__ == '__main__':
+    main()
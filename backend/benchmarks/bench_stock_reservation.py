@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Concurrent checkouts against one SKU: reservation latency/throughput and an oversell check.
+Needs a MongoDB (MONGO_URL); works in a throwaway database that is dropped afterwards.
+
+With --flash the SKU is served from the in-memory flash-sale counters and holds are flushed in batches.
+
+Usage (from backend/):
+    python benchmarks/bench_stock_reservation.py [checkouts] [stock] [quantity] [--flash]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+import inventory
+
+
+async def checkout(db, product_id, quantity, latencies):
+    order_id = f"order_{uuid.uuid4().hex[:12]}"
+    started = time.perf_counter()
+    try:
+        await inventory.reserve(db, order_id, [{"product_id": product_id, "quantity": quantity}])
+        ok = True
+    except inventory.InsufficientStock:
+        ok = False
+    latencies.append((time.perf_counter() - started) * 1000)
+    return ok
+
+
+async def main():
+    flash = "--flash" in sys.argv
+    args = [a for a in sys.argv[1:] if a != "--flash"]
+    checkouts = int(args[0]) if len(args) > 0 else 500
+    stock = int(args[1]) if len(args) > 1 else 3
+    quantity = int(args[2]) if len(args) > 2 else 1
+
+    client = AsyncIOMotorClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017'))
+    db = client[f"bench_reservations_{uuid.uuid4().hex[:8]}"]
+    try:
+        product_id = "prod_flash_sale"
+        await db.products.insert_one({"product_id": product_id, "name": "Flash Sale Necklace", "stock": stock})
+        await db.stock_reservations.create_index("order_id", unique=True)
+        if flash:
+            await inventory.flash_sale.load(db, [product_id])
+
+        latencies = []
+        started = time.perf_counter()
+        results = await asyncio.gather(*(checkout(db, product_id, quantity, latencies) for _ in range(checkouts)))
+        if flash:
+            await inventory.flash_sale.flush(db)
+        elapsed = time.perf_counter() - started
+
+        product = await db.products.find_one({"product_id": product_id})
+        succeeded = sum(results)
+        latencies.sort()
+        print(f"Checkouts: {checkouts} concurrent, stock {stock}, quantity {quantity}"
+              f"{', flash-sale counters' if flash else ''}")
+        print(f"Succeeded: {succeeded}  rejected: {checkouts - succeeded}  stock left: {product['stock']}  "
+              f"holds: {len(product.get('stock_holds', {}))}")
+        print(f"Throughput: {checkouts / elapsed:,.0f} checkouts/s  "
+              f"latency p50 {statistics.median(latencies):.1f} ms  p95 {latencies[int(len(latencies) * 0.95) - 1]:.1f} ms")
+
+        assert succeeded == stock // quantity, "oversold or undersold"
+        assert product["stock"] == stock - succeeded * quantity >= 0
+    finally:
+        await client.drop_database(db.name)
+        client.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Typeahead latency of the sorted-array prefix index, one keystroke at a time
+
+Usage (from backend/):
+    python benchmarks/bench_suggest.py [products]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_search import make_products, latency_ms
+from suggest_index import SuggestIndex
+
+TYPED = ["sapphire", "kundan bridal", "neck", "emerald ear", "platinum", "zzz"]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    products = make_products(count)
+
+    index = SuggestIndex()
+    started = time.perf_counter()
+    for p in products:
+        index.add(p["product_id"], p)
+    index.suggest("a")  # first query merges the buffered inserts
+    build = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for p in products[:1000]:
+        index.add(p["product_id"], p)
+    index.suggest("a")
+    update_us = (time.perf_counter() - started) / 1000 * 1e6
+
+    print(f"Products: {count}  entries: {len(index)}")
+    print(f"Index build: {build:.2f}s  single-product update: {update_us:.1f} µs")
+    print(f"{'typed':<16}{'p50 ms':>10}{'p95 ms':>10}")
+    for text in TYPED:
+        for n in range(1, len(text) + 1):
+            prefix = text[:n]
+            p50, p95 = latency_ms(lambda: index.suggest(prefix, limit=8), 200)
+            print(f"{prefix:<16}{p50:>10.3f}{p95:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
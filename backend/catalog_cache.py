@@ -0,0 +1,258 @@
+"""
+In-process catalog snapshot for House of Neelam
+Holds every product in memory (by id and by category) so catalog reads skip MongoDB.
+Kept fresh by a change stream on `products`, or by periodic reloads when change
+streams are unavailable (standalone mongod).
+
+Also tracks the catalog version, a counter in db.catalog_meta bumped on every
+catalog write and used for HTTP ETags. Checkout stock changes are coalesced: they
+bump the version at most once per stock_interval instead of once per order.
+"""
+
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Callable, Dict, Iterable, List, Optional, Set
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure, PyMongoError
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Change streams need a replica set; standalone servers reject them with this code
+CHANGE_STREAM_UNSUPPORTED = 40573
+
+VERSION_KEY = {"_id": "catalog_version"}
+
+
+def _same_except_stock(previous: Dict, doc: Dict) -> bool:
+    """True when only `stock` differs: listeners (search, suggest, facets) do not index it"""
+    return {k: v for k, v in previous.items() if k != "stock"} == {k: v for k, v in doc.items() if k != "stock"}
+
+
+class CatalogSnapshot:
+    def __init__(self, poll_interval: float = 30.0, retry_delay: float = 5.0, stock_interval: float = 5.0):
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.stock_interval = stock_interval
+        self._stock_changed: Set[str] = set()
+        self.by_id: Dict[str, Dict] = {}
+        self.by_category: Dict[str, Dict[str, Dict]] = {}
+        self._product_ids: Dict[object, str] = {}
+        self._listeners: List[Callable] = []
+        self.ready = False
+        self.mode: Optional[str] = None
+        self.version: Optional[int] = None
+
+    # ---------- reads ----------
+
+    def get(self, product_id: str) -> Optional[Dict]:
+        return self.by_id.get(product_id)
+
+    def list(self, category: Optional[str] = None, in_stock: bool = False, limit: Optional[int] = None) -> List[Dict]:
+        products = self.by_category.get(category, {}).values() if category else self.by_id.values()
+        if in_stock:
+            products = (p for p in products if p.get("stock", 0) > 0)
+        return list(islice(products, limit))
+
+    # ---------- writes ----------
+
+    def add_listener(self, listener: Callable):
+        """listener(product_id, doc) is called after every change; doc is None on delete"""
+        self._listeners.append(listener)
+
+    @staticmethod
+    def _normalize(doc: Dict):
+        doc = dict(doc)
+        object_id = doc.pop("_id", None)
+        # Per-order stock hold markers (inventory.py) are not part of the public product
+        doc.pop("stock_holds", None)
+        for field in ("created_at", "updated_at"):
+            value = doc.get(field)
+            if isinstance(value, str):
+                value = datetime.fromisoformat(value)
+            # Store naive UTC, matching what MongoDB returns, whichever path the doc came from
+            if isinstance(value, datetime) and value.tzinfo is not None:
+                value = value.astimezone(timezone.utc).replace(tzinfo=None)
+            if value is not None:
+                doc[field] = value
+        return object_id, doc
+
+    def upsert(self, doc: Dict):
+        object_id, doc = self._normalize(doc)
+        product_id = doc["product_id"]
+        if object_id is not None:
+            self._product_ids[object_id] = product_id
+
+        previous = self.by_id.get(product_id)
+        if previous and previous.get("category") != doc.get("category"):
+            self.by_category.get(previous.get("category"), {}).pop(product_id, None)
+        self.by_id[product_id] = doc
+        self.by_category.setdefault(doc.get("category"), {})[product_id] = doc
+        if previous is None or not _same_except_stock(previous, doc):
+            self._notify(product_id, doc)
+
+    def remove(self, product_id: str):
+        previous = self.by_id.pop(product_id, None)
+        if previous:
+            self.by_category.get(previous.get("category"), {}).pop(product_id, None)
+            self._notify(product_id, None)
+
+    def _notify(self, product_id: str, doc: Optional[Dict]):
+        for listener in self._listeners:
+            try:
+                listener(product_id, doc)
+            except Exception as e:
+                logger.error(f"Catalog listener error: {str(e)}")
+
+    # ---------- version ----------
+
+    async def bump_version(self, db) -> int:
+        """Record a catalog write (products or categories) so cached responses revalidate"""
+        meta = await db.catalog_meta.find_one_and_update(
+            VERSION_KEY,
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        self._set_version(meta["version"])
+        return self.version
+
+    def stock_changed(self, product_ids: Iterable[str]):
+        """Record a checkout stock change; published by publish_stock_changes(), off the checkout path"""
+        self._stock_changed.update(product_ids)
+
+    async def publish_stock_changes(self, db):
+        """Refresh changed products in the snapshot and bump the version once for all of them"""
+        if not self._stock_changed:
+            return
+        product_ids, self._stock_changed = self._stock_changed, set()
+        try:
+            # A change stream delivers the new documents by itself
+            if self.ready and self.mode != "change_stream":
+                docs = await db.products.find({"product_id": {"$in": list(product_ids)}}).to_list(None)
+                for doc in docs:
+                    self.upsert(doc)
+            await self.bump_version(db)
+        except Exception:
+            self._stock_changed |= product_ids
+            raise
+
+    async def run_stock_changes(self, db):
+        """Background task: publish checkout stock changes every stock_interval"""
+        while True:
+            await asyncio.sleep(self.stock_interval)
+            try:
+                await self.publish_stock_changes(db)
+            except Exception as e:
+                logger.error(f"Catalog stock publish error: {str(e)}")
+
+    async def load_version(self, db):
+        meta = await db.catalog_meta.find_one(VERSION_KEY)
+        self._set_version(meta["version"] if meta else 0)
+
+    def _set_version(self, version: int):
+        # Never move backwards if a stale read races a local bump
+        if self.version is None or version > self.version:
+            self.version = version
+
+    # ---------- sync ----------
+
+    async def load(self, db):
+        """Replace the snapshot with the current contents of db.products"""
+        await self.load_version(db)
+        docs = await db.products.find({}).to_list(None)
+        by_id, by_category, product_ids = {}, {}, {}
+        for raw in docs:
+            object_id, doc = self._normalize(raw)
+            by_id[doc["product_id"]] = doc
+            by_category.setdefault(doc.get("category"), {})[doc["product_id"]] = doc
+            product_ids[object_id] = doc["product_id"]
+
+        first_load = not self.ready
+        previous = self.by_id
+        self.by_id, self.by_category, self._product_ids = by_id, by_category, product_ids
+        self.ready = True
+
+        # Only changed products reach listeners, so periodic reloads stay cheap for them
+        for product_id, doc in by_id.items():
+            old = previous.get(product_id)
+            if old is None or not _same_except_stock(old, doc):
+                self._notify(product_id, doc)
+        for product_id in previous.keys() - by_id.keys():
+            self._notify(product_id, None)
+        if first_load:
+            logger.info(f"Catalog snapshot loaded: {len(self.by_id)} products ({self.mode})")
+
+    def _apply_change(self, change: Dict):
+        operation = change["operationType"]
+        if change.get("ns", {}).get("coll") == "catalog_meta":
+            if change.get("fullDocument"):
+                self._set_version(change["fullDocument"].get("version", 0))
+            return
+        if operation in ("insert", "update", "replace"):
+            doc = change.get("fullDocument")
+            if doc:
+                self.upsert(doc)
+            else:
+                # Deleted before the update lookup ran
+                product_id = self._product_ids.pop(change["documentKey"]["_id"], None)
+                if product_id:
+                    self.remove(product_id)
+        elif operation == "delete":
+            product_id = self._product_ids.pop(change["documentKey"]["_id"], None)
+            if product_id:
+                self.remove(product_id)
+        else:
+            # drop / rename / invalidate: the stream is over, force a reload
+            raise PyMongoError(f"products change stream ended with {operation}")
+
+    async def _watch(self, db):
+        pipeline = [{"$match": {"ns.coll": {"$in": ["products", "catalog_meta"]}}}]
+        async with db.watch(pipeline, full_document="updateLookup") as stream:
+            # Load after the stream is open so no change between the two is lost
+            self.mode = "change_stream"
+            await self.load(db)
+            async for change in stream:
+                self._apply_change(change)
+
+    async def _poll(self, db):
+        self.mode = "polling"
+        while True:
+            await self.load(db)
+            await asyncio.sleep(self.poll_interval)
+
+    async def run(self, db):
+        """Background task: watch products, falling back to polling without change streams"""
+        use_change_stream = True
+        while True:
+            try:
+                if use_change_stream:
+                    await self._watch(db)
+                else:
+                    await self._poll(db)
+            except OperationFailure as e:
+                if use_change_stream and e.code == CHANGE_STREAM_UNSUPPORTED:
+                    logger.info("Change streams unavailable, catalog snapshot will poll")
+                    use_change_stream = False
+                    continue
+                logger.error(f"Catalog sync error: {str(e)}")
+            except Exception as e:
+                logger.error(f"Catalog sync error: {str(e)}")
+            await asyncio.sleep(self.retry_delay)
+
+    def stats(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "mode": self.mode,
+            "version": self.version,
+            "products": len(self.by_id),
+            "categories": len(self.by_category)
+        }
+
+
+catalog = CatalogSnapshot(
+    poll_interval=float(os.environ.get('CATALOG_POLL_INTERVAL', '30')),
+    stock_interval=float(os.environ.get('CATALOG_STOCK_INTERVAL', '5'))
+)
@@ -1,61 +1,130 @@
-from fastapi import APIRouter, HTTPException, Query, Cookie, Header
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from motor.motor_asyncio import AsyncIOMotorClient
 from typing import List, Optional
 from datetime import datetime, timezone
+import os
+import re
 import uuid
 from enhanced_models import *
+from auth import User, require_user
+from catalog_cache import catalog
+from http_cache import conditional_response
+from inventory import PUBLIC_PRODUCT_PROJECTION
+from facets import build_facet_pipeline, facet_cache, shape_facets
+from pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_filter, product_counts
+from schema_version import parse_legacy_datetimes
+from search_index import search_index
+from sparse_fields import product_fields
+from suggest_index import suggest_index
 
 # This will be initialized from main server.py
 db = None
 
 router = APIRouter(prefix="/api", tags=["customer"])
 
+# Upper bound on search matches fed into listing/facet filters
+SEARCH_MAX_MATCHES = int(os.environ.get('SEARCH_MAX_MATCHES', '1000'))
+# Most ids accepted by /products/batch
+BATCH_MAX_IDS = int(os.environ.get('BATCH_MAX_IDS', '100'))
+
 def init_db(database):
     global db
     db = database
+    catalog.add_listener(search_index.on_catalog_change)
+    catalog.add_listener(suggest_index.on_catalog_change)
+    catalog.add_listener(facet_cache.invalidate)
 
 # ============ ENHANCED PRODUCT LISTING WITH FILTERS ============
 
-@router.get("/products/enhanced")
-async def get_products_enhanced(
-    category: Optional[str] = None,
-    subcategory: Optional[str] = None,
-    min_price: Optional[float] = None,
-    max_price: Optional[float] = None,
-    sort_by: Optional[str] = Query("newest", regex="^(newest|price_low|price_high|popular|rating)$"),
-    search: Optional[str] = None,
-    in_stock: Optional[bool] = None,
-    limit: int = Query(50, le=100),
-    skip: int = 0
-):
-    """Enhanced product listing with advanced filters"""
-    query = {}
+def _field_filters(category, subcategory, material, min_price, max_price):
+    """Per-field filters; facets drop their own field from these"""
+    filters = {}
     
     # Category filter
     if category:
-        query["category"] = category
+        filters["category"] = category
     if subcategory:
-        query["subcategory"] = subcategory
+        filters["subcategory"] = subcategory
+    if material:
+        filters["material"] = material
     
     # Price filter
     if min_price or max_price:
-        query["price"] = {}
+        filters["price"] = {}
         if min_price:
-            query["price"]["$gte"] = min_price
+            filters["price"]["$gte"] = min_price
         if max_price:
-            query["price"]["$lte"] = max_price
+            filters["price"]["$lte"] = max_price
+    
+    return filters
+
+def _shared_filters(in_stock, search):
+    """Filters that always apply, facets included"""
+    query = {}
     
     # Stock filter
     if in_stock:
         query["stock"] = {"$gt": 0}
     
-    # Search filter
+    # Search filter: full-text index once the catalog snapshot is loaded, escaped regex before that
     if search:
-        query["$or"] = [
-            {"name": {"$regex": search, "$options": "i"}},
-            {"description": {"$regex": search, "$options": "i"}},
-            {"tags": {"$in": [search]}}
-        ]
+        if catalog.ready:
+            matches = search_index.search(search, limit=SEARCH_MAX_MATCHES)
+            query["product_id"] = {"$in": [product_id for product_id, _ in matches]}
+        else:
+            pattern = re.escape(search)
+            query["$or"] = [
+                {"name": {"$regex": pattern, "$options": "i"}},
+                {"description": {"$regex": pattern, "$options": "i"}},
+                {"tags": {"$in": [search]}}
+            ]
+    
+    return query
+
+def _build_product_query(category=None, subcategory=None, material=None, min_price=None, max_price=None,
+                         in_stock=None, search=None):
+    query = _field_filters(category, subcategory, material, min_price, max_price)
+    query.update(_shared_filters(in_stock, search))
+    return query
+
+def _describe_filters(query, search):
+    """The query as echoed to clients, without the (possibly long) list of search matches"""
+    if search and "product_id" in query:
+        described = {k: v for k, v in query.items() if k != "product_id"}
+        described["search"] = search
+        return described
+    return query
+
+@router.get("/products/enhanced")
+async def get_products_enhanced(
+    request: Request,
+    response: Response,
+    category: Optional[str] = None,
+    subcategory: Optional[str] = None,
+    material: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    sort_by: Optional[str] = Query("newest", regex="^(newest|price_low|price_high|popular|rating)$"),
+    search: Optional[str] = None,
+    in_stock: Optional[bool] = None,
+    limit: int = Query(50, ge=1, le=100),
+    skip: int = 0,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    fields: Optional[str] = None
+):
+    """Enhanced product listing with advanced filters
+    
+    Pass the returned next_cursor back as `cursor` to page without skip; totals are cached briefly
+    and can be turned off with include_total=false. fields="card" (or a comma-separated list)
+    returns partial products.
+    """
+    field_set = product_fields(fields)
+    cached = conditional_response(request, response, catalog.version)
+    if cached:
+        return cached
+    
+    query = _build_product_query(category, subcategory, material, min_price, max_price, in_stock, search)
     
     # Sorting
     sort_options = {
@@ -67,48 +136,168 @@ async def get_products_enhanced(
     }
     sort_field, sort_order = sort_options.get(sort_by, ("created_at", -1))
     
-    # Get products
-    products = await db.products.find(query, {"_id": 0}).sort(sort_field, sort_order).skip(skip).limit(limit).to_list(limit)
-    
-    # Get total count for pagination
-    total_count = await db.products.count_documents(query)
-    
-    for product in products:
-        if isinstance(product.get('created_at'), str):
-            product['created_at'] = datetime.fromisoformat(product['created_at'])
-        if isinstance(product.get('updated_at'), str):
-            product['updated_at'] = datetime.fromisoformat(product['updated_at'])
-    
-    return {
+    # Get products: keyset page when a cursor is given, skip/limit otherwise
+    page_query = query
+    if cursor:
+        try:
+            last_value, last_id = decode_cursor(cursor, sort_by)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        after = keyset_filter(sort_field, sort_order, last_value, last_id)
+        page_query = {"$and": [query, after]} if query else after
+        skip = 0
+    
+    sort = [(sort_field, sort_order), ("product_id", sort_order)]
+    # The cursor needs the sort field even when the caller did not ask for it
+    projection = field_set.projection(sort_field) if field_set else PUBLIC_PRODUCT_PROJECTION
+    products = await db.products.find(page_query, projection).sort(sort).skip(skip).limit(limit).to_list(limit)
+    
+    next_cursor = encode_cursor(sort_by, products[-1], sort_field) if len(products) == limit else None
+    if field_set and sort_field not in field_set.fields:
+        for product in products:
+            product.pop(sort_field, None)
+    
+    # Total count for pagination (cached per filter and catalog version)
+    total_count = await product_counts.count(db.products, query, catalog.version) if include_total else None
+    
+    parse_legacy_datetimes(products, 'created_at', 'updated_at')
+    
+    result = {
         "products": products,
         "total": total_count,
-        "page": skip // limit + 1,
-        "pages": (total_count + limit - 1) // limit,
-        "filters_applied": query
+        "next_cursor": next_cursor,
+        "filters_applied": _describe_filters(query, search)
     }
+    if not cursor and total_count is not None:
+        result["page"] = skip // limit + 1
+        result["pages"] = (total_count + limit - 1) // limit
+    return result
+
+# ============ BATCH LOOKUP ============
+
+@router.get("/products/batch")
+async def get_products_batch(
+    request: Request,
+    response: Response,
+    ids: Optional[List[str]] = Query(None),
+    fields: Optional[str] = None
+):
+    """Products for ?ids=a,b,c (or repeated ids=), in request order, plus the ids not found"""
+    product_ids = list(dict.fromkeys(i.strip() for value in ids or [] for i in value.split(",") if i.strip()))
+    if not product_ids:
+        raise HTTPException(status_code=400, detail="No product ids given")
+    if len(product_ids) > BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_IDS} ids per request")
+    field_set = product_fields(fields)
+    
+    cached = conditional_response(request, response, catalog.version)
+    if cached:
+        return cached
+    
+    found = {}
+    if catalog.ready:
+        found = {product_id: catalog.get(product_id) for product_id in product_ids}
+        found = {product_id: doc for product_id, doc in found.items() if doc}
+        if field_set:
+            found = {product_id: field_set.select(doc) for product_id, doc in found.items()}
+    # Without a snapshot, or for products it has not seen yet (created by another worker since the
+    # last poll): one query for the rest
+    misses = [product_id for product_id in product_ids if product_id not in found]
+    if misses:
+        projection = field_set.projection() if field_set else PUBLIC_PRODUCT_PROJECTION
+        docs = await db.products.find({"product_id": {"$in": misses}}, projection).to_list(len(misses))
+        parse_legacy_datetimes(docs, 'created_at', 'updated_at')
+        found.update((doc["product_id"], doc) for doc in docs)
+    
+    return {
+        "products": [found[product_id] for product_id in product_ids if product_id in found],
+        "missing": [product_id for product_id in product_ids if product_id not in found]
+    }
+
+# ============ FACETED FILTER COUNTS ============
+
+@router.get("/products/facets")
+async def get_product_facets(
+    request: Request,
+    response: Response,
+    category: Optional[str] = None,
+    subcategory: Optional[str] = None,
+    material: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    search: Optional[str] = None,
+    in_stock: Optional[bool] = None
+):
+    """Counts per category, subcategory, material and price range for the current filters"""
+    cached = conditional_response(request, response, catalog.version)
+    if cached:
+        return cached
+    
+    key = facet_cache.signature(
+        catalog.version, category=category, subcategory=subcategory, material=material,
+        min_price=min_price, max_price=max_price, search=search, in_stock=bool(in_stock)
+    )
+    facets = facet_cache.get(key)
+    if facets is None:
+        pipeline = build_facet_pipeline(
+            _shared_filters(in_stock, search),
+            _field_filters(category, subcategory, material, min_price, max_price)
+        )
+        raw = await db.products.aggregate(pipeline).to_list(1)
+        facets = shape_facets(raw[0] if raw else {})
+        facet_cache.set(key, facets)
+    
+    return facets
 
 # ============ PRODUCT SEARCH ============
 
 @router.get("/products/search")
 async def search_products(
     q: str = Query(..., min_length=2),
-    limit: int = Query(20, le=50)
+    limit: int = Query(20, le=50),
+    fuzzy: Optional[bool] = None
 ):
-    """Search products by name, description, or tags"""
-    query = {
-        "$or": [
-            {"name": {"$regex": q, "$options": "i"}},
-            {"description": {"$regex": q, "$options": "i"}},
-            {"category": {"$regex": q, "$options": "i"}},
-            {"tags": {"$regex": q, "$options": "i"}}
-        ]
-    }
-    
-    products = await db.products.find(query, {"_id": 0}).limit(limit).to_list(limit)
+    """Search products by name, description, category, or tags, best matches first
+    
+    Misspelled words are matched to close spellings; fuzzy=true also widens correctly spelled
+    words, fuzzy=false disables typo tolerance.
+    """
+    corrections = {}
+    if catalog.ready:
+        expanded, matches = search_index.query(q, limit=limit, fuzzy=fuzzy)
+        products = [catalog.get(product_id) for product_id, _ in matches]
+        corrections = {
+            term: [alternative for alternative, _ in alternatives if alternative != term]
+            for term, alternatives in expanded.items()
+            if any(alternative != term for alternative, _ in alternatives)
+        }
+    else:
+        pattern = re.escape(q)
+        query = {
+            "$or": [
+                {"name": {"$regex": pattern, "$options": "i"}},
+                {"description": {"$regex": pattern, "$options": "i"}},
+                {"category": {"$regex": pattern, "$options": "i"}},
+                {"tags": {"$regex": pattern, "$options": "i"}}
+            ]
+        }
+        products = await db.products.find(query, PUBLIC_PRODUCT_PROJECTION).limit(limit).to_list(limit)
     
     return {
         "results": products,
         "count": len(products),
+        "query": q,
+        "corrections": corrections
+    }
+
+@router.get("/products/suggest")
+async def suggest_products(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(8, ge=1, le=20)
+):
+    """Typeahead: categories, subcategories, product names and tags starting with q"""
+    return {
+        "suggestions": suggest_index.suggest(q, limit=limit),
         "query": q
     }
 
@@ -117,16 +306,9 @@ async def search_products(
 @router.post("/wishlist/add")
 async def add_to_wishlist(
     product_id: str,
-    authorization: Optional[str] = Header(None),
-    session_token: Optional[str] = Cookie(None)
+    user: User = Depends(require_user)
 ):
     """Add product to wishlist"""
-    # Get user from session
-    from server import get_current_user
-    user = await get_current_user(authorization, session_token)
-    if not user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
     # Check if product exists
     product = await db.products.find_one({"product_id": product_id}, {"_id": 0})
     if not product:
@@ -153,15 +335,9 @@ async def add_to_wishlist(
 @router.delete("/wishlist/remove/{product_id}")
 async def remove_from_wishlist(
     product_id: str,
-    authorization: Optional[str] = Header(None),
-    session_token: Optional[str] = Cookie(None)
+    user: User = Depends(require_user)
 ):
     """Remove product from wishlist"""
-    from server import get_current_user
-    user = await get_current_user(authorization, session_token)
-    if not user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
     result = await db.wishlist.delete_one({
         "user_id": user.user_id,
         "product_id": product_id
@@ -174,21 +350,15 @@ async def remove_from_wishlist(
 
 @router.get("/wishlist")
 async def get_wishlist(
-    authorization: Optional[str] = Header(None),
-    session_token: Optional[str] = Cookie(None)
+    user: User = Depends(require_user)
 ):
     """Get user's wishlist with product details"""
-    from server import get_current_user
-    user = await get_current_user(authorization, session_token)
-    if not user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
     # Get wishlist items
     wishlist_items = await db.wishlist.find({"user_id": user.user_id}, {"_id": 0}).to_list(1000)
     
     # Get product details
     product_ids = [item["product_id"] for item in wishlist_items]
-    products = await db.products.find({"product_id": {"$in": product_ids}}, {"_id": 0}).to_list(1000)
+    products = await db.products.find({"product_id": {"$in": product_ids}}, PUBLIC_PRODUCT_PROJECTION).to_list(1000)
     
     # Combine with added_at timestamps
     wishlist_with_details = []
@@ -207,15 +377,9 @@ async def get_wishlist(
 @router.post("/reviews")
 async def create_review(
     review: ReviewCreate,
-    authorization: Optional[str] = Header(None),
-    session_token: Optional[str] = Cookie(None)
+    user: User = Depends(require_user)
 ):
     """Create a product review"""
-    from server import get_current_user
-    user = await get_current_user(authorization, session_token)
-    if not user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
     # Validate rating
     if review.rating < 1 or review.rating > 5:
         raise HTTPException(status_code=400, detail="Rating must be between 1 and 5")
@@ -258,6 +422,7 @@ async def create_review(
             "reviews_count": len(all_reviews)
         }}
     )
+    await catalog.bump_version(db)
     
     return Review(**review_data)
 
@@ -266,16 +431,18 @@ async def get_product_reviews(product_id: str):
     """Get all reviews for a product"""
     reviews = await db.reviews.find({"product_id": product_id}, {"_id": 0}).sort("created_at", -1).to_list(1000)
     
-    for review in reviews:
-        if isinstance(review['created_at'], str):
-            review['created_at'] = datetime.fromisoformat(review['created_at'])
+    parse_legacy_datetimes(reviews, 'created_at')
     
     return reviews
 
 # ============ CATEGORIES (PUBLIC) ============
 
 @router.get("/categories")
-async def get_all_categories():
+async def get_all_categories(request: Request, response: Response):
     """Get all categories for customer browsing"""
+    cached = conditional_response(request, response, catalog.version)
+    if cached:
+        return cached
+    
     categories = await db.categories.find({}, {"_id": 0}).to_list(1000)
     return categories
@@ -0,0 +1,60 @@
+"""
+MongoDB index management for House of Neelam
+Indexes are created idempotently on startup
+"""
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+async def _create_index(collection, keys, **kwargs):
+    """Create an index, logging instead of failing startup if existing data conflicts with it"""
+    try:
+        await collection.create_index(keys, **kwargs)
+    except OperationFailure as e:
+        logger.warning(f"Could not create index {kwargs.get('name', keys)} on {collection.name}: {str(e)}")
+
+
+async def ensure_indexes(db):
+    # Sessions: token lookups, per-user snapshot refreshes, and TTL expiry
+    await _create_index(db.user_sessions, [("session_token", ASCENDING)], unique=True, name="session_token_unique")
+    await _create_index(db.user_sessions, [("user_id", ASCENDING)], name="user_id")
+    await _create_index(db.user_sessions, [("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl")
+
+    # Signed-token revocations only need to outlive the token they revoke
+    await _create_index(db.revoked_sessions, [("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl")
+    await _create_index(db.revoked_sessions, [("revoked_at", ASCENDING)], name="revoked_at")
+
+    # One guest user per phone number; guest_auth upserts against this
+    await _create_index(
+        db.users,
+        [("phone", ASCENDING)],
+        unique=True,
+        partialFilterExpression={"role": "guest"},
+        name="guest_phone_unique"
+    )
+
+    # Product listings: keyset pagination sorts on (field, product_id) for each sort option
+    await _create_index(db.products, [("product_id", ASCENDING)], name="product_id")
+    # Bulk import upserts rows without a product_id on (name, category)
+    await _create_index(db.products, [("category", ASCENDING), ("name", ASCENDING)], name="category_name")
+    for field, order in (("created_at", DESCENDING), ("price", ASCENDING), ("reviews_count", DESCENDING), ("rating", DESCENDING)):
+        await _create_index(db.products, [(field, order), ("product_id", order)], name=f"{field}_product_id")
+        await _create_index(db.products, [("category", ASCENDING), (field, order), ("product_id", order)], name=f"category_{field}_product_id")
+
+    # Orders: lookups by id, and each customer's history newest first with order_id as the keyset tiebreak
+    await _create_index(db.orders, [("order_id", ASCENDING)], unique=True, name="order_id_unique")
+    await _create_index(
+        db.orders,
+        [("user_id", ASCENDING), ("created_at", DESCENDING), ("order_id", DESCENDING)],
+        name="user_id_created_at"
+    )
+
+    # Stock reservations: one per order, swept by expiry
+    await _create_index(db.stock_reservations, [("order_id", ASCENDING)], unique=True, name="order_id_unique")
+    await _create_index(db.stock_reservations, [("status", ASCENDING), ("expires_at", ASCENDING)], name="status_expires_at")
+
+    logger.info("Database indexes ensured")
@@ -0,0 +1,108 @@
+"""
+Faceted filter counts for House of Neelam product listings
+All facet counts for a filter set come from one $facet aggregation. Each facet ignores its own
+filter (so the UI can still show sibling categories, other price ranges, ...) but applies the rest.
+Results are cached per filter signature until the catalog changes.
+"""
+
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import json
+import os
+
+# Upper bounds are exclusive; anything >= the last boundary lands in the open-ended bucket
+PRICE_BUCKETS = [float(b) for b in os.environ.get('FACET_PRICE_BUCKETS', '0,500,1000,2500,5000,10000').split(',')]
+
+FACET_FIELDS = {
+    "categories": "category",
+    "subcategories": "subcategory",
+    "materials": "material",
+}
+
+
+def _match_except(filters: Dict[str, Dict], skip: Optional[str]) -> Dict:
+    return {field: condition for field, condition in filters.items() if field != skip}
+
+
+def _value_facet(field: str, filters: Dict[str, Dict]) -> List[Dict]:
+    match = _match_except(filters, field)
+    match.setdefault(field, {"$ne": None})
+    return [
+        {"$match": match},
+        {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1, "_id": 1}}
+    ]
+
+
+def build_facet_pipeline(base_query: Dict, filters: Dict[str, Dict]) -> List[Dict]:
+    """
+    base_query: filters shared by every facet (stock, search)
+    filters: per-field filters ({"category": "Rings", "price": {"$gte": 100}}) each facet may drop
+    """
+    facets = {name: _value_facet(field, filters) for name, field in FACET_FIELDS.items()}
+    facets["price_ranges"] = [
+        {"$match": _match_except(filters, "price")},
+        {"$bucket": {
+            "groupBy": "$price",
+            "boundaries": PRICE_BUCKETS + [float("inf")],
+            "default": "other",
+            "output": {"count": {"$sum": 1}}
+        }}
+    ]
+    facets["total"] = [{"$match": filters}, {"$count": "count"}]
+    return [{"$match": base_query}, {"$facet": facets}]
+
+
+def shape_facets(raw: Dict) -> Dict:
+    result = {
+        name: [{"value": row["_id"], "count": row["count"]} for row in raw.get(name, [])]
+        for name in FACET_FIELDS
+    }
+    bounds = PRICE_BUCKETS + [None]
+    result["price_ranges"] = [
+        {"min": row["_id"], "max": bounds[bounds.index(row["_id"]) + 1], "count": row["count"]}
+        for row in raw.get("price_ranges", [])
+        if row["_id"] in PRICE_BUCKETS
+    ]
+    total = raw.get("total") or [{"count": 0}]
+    result["total"] = total[0]["count"]
+    return result
+
+
+class FacetCache:
+    """Facet results per filter signature; cleared whenever the catalog snapshot changes"""
+
+    def __init__(self, max_size: int = 512):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def signature(version: Optional[int], **params) -> str:
+        return f"{version}:{json.dumps(params, sort_keys=True, default=str)}"
+
+    def get(self, key: str) -> Optional[Dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, value: Dict):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, *_):
+        """Usable directly as a catalog listener"""
+        self._entries.clear()
+
+    def stats(self) -> Dict:
+        return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+facet_cache = FacetCache()
@@ -0,0 +1,54 @@
+"""
+Fast JSON response path for House of Neelam list endpoints
+Documents read from MongoDB are already shaped by our own writes, so instead of validating every
+row through the response model we project the model's fields and serialize with orjson.
+Opt-in with FAST_JSON_RESPONSES=1.
+"""
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from typing import Dict, Iterable, List, Optional, Type
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FAST_JSON_RESPONSES = os.environ.get('FAST_JSON_RESPONSES', '0') == '1'
+if FAST_JSON_RESPONSES and orjson is None:
+    logger.warning("FAST_JSON_RESPONSES is set but orjson is not installed; using the standard response path")
+    FAST_JSON_RESPONSES = False
+
+
+def model_projection(model: Type[BaseModel]) -> Dict:
+    """Mongo projection returning only the fields the response model exposes"""
+    projection = {"_id": 0}
+    projection.update({field: 1 for field in model.model_fields})
+    return projection
+
+
+def trusted_rows(model: Type[BaseModel], docs: Iterable[Dict]) -> List[Dict]:
+    """Shape trusted documents like model.model_dump() would, without validation"""
+    defaults = {name: field.get_default(call_default_factory=True) for name, field in model.model_fields.items()}
+    return [{name: doc.get(name, default) for name, default in defaults.items()} for doc in docs]
+
+
+def fast_json_response(content, response: Optional[Response] = None) -> Response:
+    """Serialize with orjson; headers already set on the injected response (ETag etc.) are kept"""
+    headers = {k: v for k, v in response.headers.items() if k != "content-length"} if response else None
+    if orjson is None:
+        # Sparse-fieldset responses use this path regardless of FAST_JSON_RESPONSES
+        body = json.dumps(jsonable_encoder(content), separators=(",", ":")).encode()
+    else:
+        body = orjson.dumps(content, option=orjson.OPT_UTC_Z)
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers=headers
+    )
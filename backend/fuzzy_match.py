@@ -0,0 +1,99 @@
+"""
+Typo tolerance for House of Neelam product search
+A trigram index over the search vocabulary finds candidate terms for a misspelled word, and a
+bounded Levenshtein distance picks the close ones ("saphire" -> "sapphire", "neckless" -> "necklace").
+Only alphabetic terms are indexed and the vocabulary is capped, so memory stays bounded.
+"""
+
+from typing import Dict, List, Optional, Set, Tuple
+import os
+
+FUZZY_MAX_TERMS = int(os.environ.get('FUZZY_MAX_TERMS', '50000'))
+
+# Shorter words are rarely misspelled in a way a fuzzy match would fix without false positives
+MIN_TERM_LENGTH = 4
+
+
+def max_distance(term: str) -> int:
+    if len(term) < 5:
+        return 1
+    if len(term) < 8:
+        return 2
+    return 3
+
+
+def trigrams(term: str) -> Set[str]:
+    padded = f"${term}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def levenshtein_within(a: str, b: str, limit: int) -> Optional[int]:
+    """Edit distance between a and b, or None as soon as it must exceed limit"""
+    if abs(len(a) - len(b)) > limit:
+        return None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= limit else None
+
+
+class TrigramVocabulary:
+    def __init__(self, max_terms: int = FUZZY_MAX_TERMS, max_candidates: int = 200):
+        self.max_terms = max_terms
+        self.max_candidates = max_candidates
+        self.grams: Dict[str, Set[str]] = {}
+        self.terms: Set[str] = set()
+        self.skipped = 0
+
+    def __len__(self):
+        return len(self.terms)
+
+    def add(self, term: str):
+        if term in self.terms or len(term) < MIN_TERM_LENGTH or not term.isalpha():
+            return
+        if len(self.terms) >= self.max_terms:
+            self.skipped += 1
+            return
+        self.terms.add(term)
+        for gram in trigrams(term):
+            self.grams.setdefault(gram, set()).add(term)
+
+    def remove(self, term: str):
+        if term not in self.terms:
+            return
+        self.terms.discard(term)
+        for gram in trigrams(term):
+            bucket = self.grams.get(gram)
+            if bucket is not None:
+                bucket.discard(term)
+                if not bucket:
+                    del self.grams[gram]
+
+    def neighbours(self, term: str, limit: int = 3) -> List[Tuple[str, int]]:
+        """Up to `limit` (term, distance) pairs within max_distance(term), closest first"""
+        if len(term) < MIN_TERM_LENGTH:
+            return []
+        shared: Dict[str, int] = {}
+        for gram in trigrams(term):
+            for candidate in self.grams.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+
+        allowed = max_distance(term)
+        candidates = sorted(shared, key=shared.get, reverse=True)[:self.max_candidates]
+        matches = []
+        for candidate in candidates:
+            if candidate == term:
+                continue
+            distance = levenshtein_within(term, candidate, allowed)
+            if distance is not None:
+                matches.append((distance, -shared[candidate], candidate))
+        matches.sort()
+        return [(candidate, distance) for distance, _, candidate in matches[:limit]]
+
+    def stats(self) -> Dict:
+        return {"terms": len(self.terms), "trigrams": len(self.grams), "skipped": self.skipped}
@@ -0,0 +1,45 @@
+"""
+HTTP caching helpers for House of Neelam catalog endpoints
+Strong ETags derived from the catalog version plus the request URL, and If-None-Match handling
+"""
+
+from fastapi import Request, Response
+from typing import Optional
+import hashlib
+import os
+
+CATALOG_CACHE_MAX_AGE = int(os.environ.get('CATALOG_CACHE_MAX_AGE', '0'))
+
+
+def catalog_etag(request: Request, version: int) -> str:
+    """Same catalog version + same path and query => same representation"""
+    query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    digest = hashlib.sha1(f"{request.url.path}?{query}".encode()).hexdigest()[:16]
+    return f'"v{version}-{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def cache_control() -> str:
+    if CATALOG_CACHE_MAX_AGE > 0:
+        return f"public, max-age={CATALOG_CACHE_MAX_AGE}"
+    return "public, max-age=0, must-revalidate"
+
+
+def conditional_response(request: Request, response: Response, version: Optional[int]) -> Optional[Response]:
+    """Return a 304 if the client already has this version; otherwise tag the response and return None"""
+    if version is None:
+        return None
+
+    headers = {"ETag": catalog_etag(request, version), "Cache-Control": cache_control()}
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
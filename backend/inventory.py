@@ -0,0 +1,491 @@
+"""
+Stock reservations for House of Neelam orders
+Creating an order takes stock with one unordered bulk_write of conditional updates
+({stock: {$gte: qty}} -> $inc: -qty) and leaves a hold marker, products.stock_holds.<order_id>,
+on each product. The markers make every later step idempotent:
+
+- commit (payment verified): drop the markers, the stock stays taken
+- release (order expired unpaid, or a partial reservation): give the stock back and drop the markers
+
+db.stock_reservations tracks each order's hold; its status field (held -> committed, or
+held -> releasing -> released) is claimed atomically so payment verification and the expiry
+sweeper never both act on the same hold.
+
+Flash-sale products (FLASH_SALE_PRODUCTS) skip the per-order write to the hot product document:
+holds are granted from an in-process counter and flushed to `products` in batches, one update per
+product carrying every pending hold marker. A reservation lists its unflushed products in
+flash_pending, so a restart re-applies them before the counters are rebuilt. Counters live in one
+process: serve flash-sale checkouts from a single API worker.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+from pymongo import ReturnDocument, UpdateOne
+import asyncio
+import logging
+import os
+
+from catalog_cache import catalog
+
+logger = logging.getLogger(__name__)
+
+RESERVATION_TTL = float(os.environ.get('RESERVATION_TTL', '1800'))
+RESERVATION_SWEEP_INTERVAL = float(os.environ.get('RESERVATION_SWEEP_INTERVAL', '60'))
+
+# A sweeper that died mid-release leaves "releasing" rows; retry them after this long
+STALE_RELEASE_SECONDS = 300
+
+FLASH_SALE_PRODUCTS = [p.strip() for p in os.environ.get('FLASH_SALE_PRODUCTS', '').split(',') if p.strip()]
+FLASH_SALE_FLUSH_INTERVAL = float(os.environ.get('FLASH_SALE_FLUSH_INTERVAL', '0.5'))
+
+# Hold markers are internal; public product reads exclude them
+PUBLIC_PRODUCT_PROJECTION = {"_id": 0, "stock_holds": 0}
+
+
+class InsufficientStock(Exception):
+    def __init__(self, unavailable: List[str], missing: List[str]):
+        self.unavailable = unavailable
+        self.missing = missing
+        super().__init__(f"Insufficient stock for {unavailable}, unknown products {missing}")
+
+
+def _hold(order_id: str) -> str:
+    return f"stock_holds.{order_id}"
+
+
+def quantities(items: Iterable[Dict]) -> Dict[str, int]:
+    """Total quantity per product_id (a cart may list a product twice)"""
+    totals: Dict[str, int] = {}
+    for item in items:
+        totals[item["product_id"]] = totals.get(item["product_id"], 0) + item["quantity"]
+    return totals
+
+
+def take_ops(order_id: str, wanted: Dict[str, int]) -> List[UpdateOne]:
+    return [
+        UpdateOne(
+            {"product_id": product_id, "stock": {"$gte": quantity}, _hold(order_id): {"$exists": False}},
+            {"$inc": {"stock": -quantity}, "$set": {_hold(order_id): quantity}}
+        )
+        for product_id, quantity in wanted.items()
+    ]
+
+
+def release_ops(order_id: str, held: Dict[str, int]) -> List[UpdateOne]:
+    return [
+        UpdateOne(
+            {"product_id": product_id, _hold(order_id): {"$exists": True}},
+            {"$inc": {"stock": quantity}, "$unset": {_hold(order_id): ""}}
+        )
+        for product_id, quantity in held.items()
+    ]
+
+
+def commit_ops(order_id: str, held: Dict[str, int]) -> List[UpdateOne]:
+    return [
+        UpdateOne({"product_id": product_id, _hold(order_id): {"$exists": True}}, {"$unset": {_hold(order_id): ""}})
+        for product_id in held
+    ]
+
+
+async def _take(db, order_id: str, wanted: Dict[str, int]):
+    """Take stock for every product or none of them; raises InsufficientStock"""
+    result = await db.products.bulk_write(take_ops(order_id, wanted), ordered=False)
+    if result.modified_count == len(wanted):
+        catalog.stock_changed(wanted)
+        return
+
+    # Some products were short: find out which updates landed and give those back
+    taken = await db.products.find(
+        {"product_id": {"$in": list(wanted)}, _hold(order_id): {"$exists": True}},
+        {"_id": 0, "product_id": 1}
+    ).to_list(len(wanted))
+    taken_ids = {doc["product_id"] for doc in taken}
+    if taken_ids:
+        await db.products.bulk_write(release_ops(order_id, {p: wanted[p] for p in taken_ids}), ordered=False)
+
+    failed = [p for p in wanted if p not in taken_ids]
+    existing = await db.products.find({"product_id": {"$in": failed}}, {"_id": 0, "product_id": 1}).to_list(len(failed))
+    existing_ids = {doc["product_id"] for doc in existing}
+    raise InsufficientStock(
+        unavailable=[p for p in failed if p in existing_ids],
+        missing=[p for p in failed if p not in existing_ids]
+    )
+
+
+async def reserve(db, order_id: str, items: Iterable[Dict], ttl: float = RESERVATION_TTL) -> Dict:
+    """Hold stock for a new order; raises InsufficientStock and leaves nothing held"""
+    wanted = quantities(items)
+    flash = {p: q for p, q in wanted.items() if flash_sale.handles(p)}
+    regular = {p: q for p, q in wanted.items() if p not in flash}
+    now = datetime.now(timezone.utc)
+    reservation = {
+        "order_id": order_id,
+        "items": [{"product_id": p, "quantity": q} for p, q in wanted.items()],
+        "flash_pending": list(flash),
+        "status": "held",
+        "expires_at": now + timedelta(seconds=ttl),
+        "created_at": now,
+        "updated_at": now
+    }
+    # Recorded first so the sweeper (or flash-sale reconciliation) can clean up if we die mid-way
+    await db.stock_reservations.insert_one(reservation.copy())
+    try:
+        unavailable = flash_sale.try_take(order_id, flash)
+        if unavailable:
+            raise InsufficientStock(unavailable=unavailable, missing=[])
+        if regular:
+            try:
+                await _take(db, order_id, regular)
+            except InsufficientStock:
+                if flash:
+                    await release(db, order_id, reservation)
+                raise
+    except InsufficientStock:
+        # Nothing is held any more; other failures stay "held" for the sweeper to release
+        await db.stock_reservations.update_one(
+            {"order_id": order_id},
+            {"$set": {"status": "released", "flash_pending": [], "updated_at": datetime.now(timezone.utc)}}
+        )
+        raise
+    return reservation
+
+
+def _held(reservation: Dict) -> Dict[str, int]:
+    return {item["product_id"]: item["quantity"] for item in reservation["items"]}
+
+
+async def release(db, order_id: str, reservation: Optional[Dict] = None) -> bool:
+    """Give held stock back (order abandoned or failed to save); False if nothing was held"""
+    if reservation is None:
+        reservation = await db.stock_reservations.find_one_and_update(
+            {"order_id": order_id, "status": "held"},
+            {"$set": {"status": "releasing", "updated_at": datetime.now(timezone.utc)}}
+        )
+        if not reservation:
+            return False
+    held = _held(reservation)
+    returned = held
+    if reservation.get("flash_pending"):
+        # Get the hold markers into `products` before releasing through them
+        await flash_sale.flush(db)
+        # A line the flush could not cover has no hold, so nothing of it goes back to the counters
+        covered = await db.products.find(
+            {"product_id": {"$in": list(held)}, _hold(order_id): {"$exists": True}},
+            {"_id": 0, "product_id": 1}
+        ).to_list(None)
+        returned = {doc["product_id"]: held[doc["product_id"]] for doc in covered}
+    result = await db.products.bulk_write(release_ops(order_id, held), ordered=False)
+    flash_sale.returned(returned)
+    if result.modified_count:
+        catalog.stock_changed(held)
+    await db.stock_reservations.update_one(
+        {"order_id": order_id},
+        {"$set": {"status": "released", "updated_at": datetime.now(timezone.utc)}}
+    )
+    return True
+
+
+async def commit(db, order_id: str) -> bool:
+    """
+    Make a paid order's hold permanent. If the hold already expired, try to take the stock again;
+    False means the order is paid but its stock is gone and needs manual follow-up.
+    """
+    pending = await db.stock_reservations.find_one({"order_id": order_id, "status": "held"}, {"flash_pending": 1})
+    if pending and pending.get("flash_pending"):
+        # Flush before claiming: a flash-sale hold the flush cannot cover is released, not committed
+        await flash_sale.flush(db)
+
+    reservation = await db.stock_reservations.find_one_and_update(
+        {"order_id": order_id, "status": {"$in": ["held", "committed"]}},
+        {"$set": {"status": "committed", "updated_at": datetime.now(timezone.utc)}},
+        return_document=ReturnDocument.BEFORE
+    )
+    if reservation:
+        if reservation["status"] == "held":
+            await db.products.bulk_write(commit_ops(order_id, _held(reservation)), ordered=False)
+        return True
+
+    # Released (expired) before the payment arrived: re-take the stock if it is still there
+    reservation = await db.stock_reservations.find_one_and_update(
+        {"order_id": order_id, "status": "released"},
+        {"$set": {"status": "committing", "updated_at": datetime.now(timezone.utc)}}
+    )
+    if not reservation:
+        # No reservation (orders placed before reservations existed), another call is committing it,
+        # or the sweeper is releasing it: release_expired() re-takes the stock for orders paid meanwhile
+        return True
+
+    held = _held(reservation)
+    await flash_sale.flush(db)
+    try:
+        await _take(db, order_id, held)
+    except InsufficientStock as e:
+        logger.error(f"Paid order {order_id} lost its stock reservation: {e}")
+        await db.stock_reservations.update_one(
+            {"order_id": order_id},
+            {"$set": {"status": "released", "updated_at": datetime.now(timezone.utc)}}
+        )
+        return False
+    flash_sale.took(held)
+    await db.products.bulk_write(commit_ops(order_id, held), ordered=False)
+    await db.stock_reservations.update_one(
+        {"order_id": order_id},
+        {"$set": {"status": "committed", "updated_at": datetime.now(timezone.utc)}}
+    )
+    return True
+
+
+async def release_expired(db, now: Optional[datetime] = None) -> int:
+    """Release every expired hold, cancelling its unpaid order"""
+    now = now or datetime.now(timezone.utc)
+    stale = now - timedelta(seconds=STALE_RELEASE_SECONDS)
+    released = 0
+    while True:
+        reservation = await db.stock_reservations.find_one_and_update(
+            {"$or": [
+                {"status": "held", "expires_at": {"$lt": now}},
+                {"status": "releasing", "updated_at": {"$lt": stale}}
+            ]},
+            {"$set": {"status": "releasing", "updated_at": now}}
+        )
+        if not reservation:
+            return released
+        order_id = reservation["order_id"]
+        await release(db, order_id, reservation)
+        cancelled = await db.orders.update_one(
+            {"order_id": order_id, "payment_status": {"$ne": "paid"}},
+            {"$set": {"status": "cancelled", "payment_status": "expired", "updated_at": now}}
+        )
+        if not cancelled.matched_count:
+            order = await db.orders.find_one({"order_id": order_id}, {"_id": 0, "payment_status": 1})
+            if order and order.get("payment_status") == "paid":
+                # Paid while we held the reservation in "releasing"; commit() left it to us
+                if not await commit(db, order_id):
+                    await db.orders.update_one(
+                        {"order_id": order_id},
+                        {"$set": {"fulfillment_issue": "insufficient_stock", "updated_at": now}}
+                    )
+        released += 1
+
+
+async def release_expired_loop(db):
+    while True:
+        try:
+            released = await release_expired(db)
+            if released:
+                logger.info(f"Released {released} expired stock reservations")
+        except Exception as e:
+            logger.error(f"Reservation sweep error: {str(e)}")
+        await asyncio.sleep(RESERVATION_SWEEP_INTERVAL)
+
+
+# ---------- flash sale ----------
+
+class FlashSaleStock:
+    def __init__(self, product_ids: Iterable[str], flush_interval: float = 0.5):
+        self.product_ids = set(product_ids)
+        self.flush_interval = flush_interval
+        self.available: Dict[str, int] = {}
+        # product_id -> {order_id: quantity} granted but not yet written to `products`
+        self.pending: Dict[str, Dict[str, int]] = {}
+        self.ready = False
+        self._lock = asyncio.Lock()
+        self.granted = 0
+        self.rejected = 0
+        self.flushes = 0
+        self.short = 0
+
+    def handles(self, product_id: str) -> bool:
+        return self.ready and product_id in self.available
+
+    # ---------- counters (no awaits: each call is atomic on the event loop) ----------
+
+    def try_take(self, order_id: str, wanted: Dict[str, int]) -> List[str]:
+        """Grant every line or none; returns the products that are short"""
+        unavailable = [p for p, q in wanted.items() if self.available[p] < q]
+        if unavailable:
+            self.rejected += 1
+            return unavailable
+        for product_id, quantity in wanted.items():
+            self.available[product_id] -= quantity
+            self.pending.setdefault(product_id, {})[order_id] = quantity
+        if wanted:
+            self.granted += 1
+        return []
+
+    def returned(self, held: Dict[str, int]):
+        """Stock given back in `products` (release_ops) is available again"""
+        for product_id, quantity in held.items():
+            if product_id in self.available:
+                self.available[product_id] += quantity
+
+    def took(self, held: Dict[str, int]):
+        """Stock taken in `products` directly (re-take after expiry)"""
+        for product_id, quantity in held.items():
+            if product_id in self.available:
+                self.available[product_id] -= quantity
+
+    # ---------- persistence ----------
+
+    async def flush(self, db):
+        """Write pending holds to `products`; one update per product"""
+        async with self._lock:
+            await self._flush_locked(db)
+
+    async def _flush_locked(self, db):
+        if not any(self.pending.values()):
+            return
+        batch, self.pending = self.pending, {}
+        try:
+            await self._write(db, batch)
+        except Exception:
+            for product_id, holds in batch.items():
+                self.pending.setdefault(product_id, {}).update(holds)
+            raise
+        self.flushes += 1
+
+    def _set_available(self, stock: Dict[str, int]):
+        """Counters from `products` stock, less holds granted since but not yet written"""
+        for product_id, value in stock.items():
+            self.available[product_id] = value - sum(self.pending.get(product_id, {}).values())
+
+    async def _write(self, db, batch: Dict[str, Dict[str, int]]):
+        batch = {p: holds for p, holds in batch.items() if holds}
+        operations = []
+        for product_id, holds in batch.items():
+            match = {"product_id": product_id, "stock": {"$gte": sum(holds.values())}}
+            match.update({_hold(order_id): {"$exists": False} for order_id in holds})
+            operations.append(UpdateOne(match, {
+                "$inc": {"stock": -sum(holds.values())},
+                "$set": {_hold(order_id): quantity for order_id, quantity in holds.items()}
+            }))
+        result = await db.products.bulk_write(operations, ordered=False)
+
+        short_orders = set()
+        if result.modified_count < len(operations):
+            # Replayed batch or stock changed underneath the counter: fall back to per-order
+            # takes, which skip holds already written and show which ones cannot be met
+            per_order = [op for p, holds in batch.items() for o, q in holds.items() for op in take_ops(o, {p: q})]
+            await db.products.bulk_write(per_order, ordered=False)
+            products = await db.products.find(
+                {"product_id": {"$in": list(batch)}}, {"_id": 0, "product_id": 1, "stock_holds": 1}
+            ).to_list(None)
+            written = {p["product_id"]: p.get("stock_holds", {}) for p in products}
+            for product_id, holds in batch.items():
+                missing = [o for o in holds if o not in written.get(product_id, {})]
+                if missing:
+                    self.short += len(missing)
+                    short_orders.update(missing)
+                    logger.error(f"Flash-sale flush for {product_id} could not take stock for orders {missing}")
+
+        for product_id, holds in batch.items():
+            await db.stock_reservations.update_many(
+                {"order_id": {"$in": list(holds)}},
+                {"$pull": {"flash_pending": product_id}}
+            )
+        catalog.stock_changed(batch)
+
+        if short_orders:
+            for order_id in short_orders:
+                await self._drop_short(db, order_id)
+            # The counters granted more than `products` holds: start them again from the stock
+            products = await db.products.find(
+                {"product_id": {"$in": list(batch)}}, {"_id": 0, "product_id": 1, "stock": 1}
+            ).to_list(None)
+            self._set_available({p["product_id"]: p.get("stock", 0) for p in products})
+
+    async def _drop_short(self, db, order_id: str):
+        """
+        Release a reservation the flush could not cover and cancel its unpaid order. A payment that
+        still arrives goes through commit()'s re-take path, which flags the order if stock is gone.
+        """
+        now = datetime.now(timezone.utc)
+        reservation = await db.stock_reservations.find_one_and_update(
+            {"order_id": order_id, "status": "held"},
+            {"$set": {"status": "releasing", "updated_at": now}}
+        )
+        if not reservation:
+            return
+        held = _held(reservation)
+        # Only lines with a hold marker give stock back; the short flash line never had one
+        result = await db.products.bulk_write(release_ops(order_id, held), ordered=False)
+        if result.modified_count:
+            catalog.stock_changed(held)
+        await db.stock_reservations.update_one(
+            {"order_id": order_id},
+            {"$set": {"status": "released", "flash_pending": [], "updated_at": now}}
+        )
+        await db.orders.update_one(
+            {"order_id": order_id, "payment_status": {"$ne": "paid"}},
+            {"$set": {"status": "cancelled", "payment_status": "stock_unavailable", "updated_at": now}}
+        )
+
+    async def load(self, db, product_ids: Optional[Iterable[str]] = None):
+        """
+        Start the counters from `products`. The first load re-applies holds a crash left unflushed;
+        later loads (after admin stock edits) flush pending holds instead of dropping them.
+        """
+        if product_ids is not None:
+            self.product_ids = set(product_ids)
+        if not self.product_ids:
+            return
+        async with self._lock:
+            if self.ready:
+                await self._flush_locked(db)
+            else:
+                await self._reapply_unflushed(db)
+
+            products = await db.products.find(
+                {"product_id": {"$in": list(self.product_ids)}},
+                {"_id": 0, "product_id": 1, "stock": 1}
+            ).to_list(None)
+            self.available = {}
+            self._set_available({p["product_id"]: p.get("stock", 0) for p in products})
+            self.ready = True
+        logger.info(f"Flash sale counters loaded: {self.available}")
+
+    async def _reapply_unflushed(self, db):
+        # Only safe before the counters are ready: no grant can be in memory yet
+        unflushed = await db.stock_reservations.find(
+            {"flash_pending": {"$in": list(self.product_ids)}, "status": {"$ne": "released"}}
+        ).to_list(None)
+        if not unflushed:
+            return
+        operations = []
+        for reservation in unflushed:
+            held = _held(reservation)
+            pending = {p: held[p] for p in reservation["flash_pending"] if p in held}
+            operations += take_ops(reservation["order_id"], pending)
+            if reservation["status"] == "committed":
+                operations += commit_ops(reservation["order_id"], pending)
+        await db.products.bulk_write(operations, ordered=True)
+        await db.stock_reservations.update_many(
+            {"order_id": {"$in": [r["order_id"] for r in unflushed]}},
+            {"$set": {"flash_pending": []}}
+        )
+        catalog.stock_changed({p for r in unflushed for p in r["flash_pending"]})
+        logger.info(f"Flash sale: re-applied {len(unflushed)} unflushed reservations")
+
+    async def run(self, db):
+        """Background task: flush pending holds every flush_interval"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush(db)
+            except Exception as e:
+                logger.error(f"Flash-sale flush error: {str(e)}")
+
+    def stats(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "available": dict(self.available),
+            "pending_holds": sum(len(h) for h in self.pending.values()),
+            "granted": self.granted,
+            "rejected": self.rejected,
+            "flushes": self.flushes,
+            "short": self.short
+        }
+
+
+flash_sale = FlashSaleStock(FLASH_SALE_PRODUCTS, FLASH_SALE_FLUSH_INTERVAL)
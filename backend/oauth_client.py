@@ -0,0 +1,117 @@
+"""
+Emergent OAuth session-data client for House of Neelam
+One pooled keep-alive HTTP client for the app lifetime, with explicit timeouts,
+bounded concurrency and a circuit breaker around the session-data endpoint
+"""
+
+from typing import Dict, Optional
+import asyncio
+import logging
+import time
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class SessionServiceUnavailable(Exception):
+    """The session-data endpoint is failing, timing out or the circuit is open"""
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures; lets one probe through after reset_timeout"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+
+class SessionDataClient:
+    def __init__(
+        self,
+        url: str,
+        connect_timeout: float = 3.0,
+        read_timeout: float = 5.0,
+        max_connections: int = 20,
+        max_concurrency: int = 20,
+        breaker: Optional[CircuitBreaker] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.url = url
+        self._timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self._limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self.breaker = breaker or CircuitBreaker()
+
+    async def start(self):
+        self._client = httpx.AsyncClient(timeout=self._timeout, limits=self._limits, transport=self._transport)
+
+    async def close(self):
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    async def fetch(self, session_id: str) -> Optional[Dict]:
+        """Return session data for a session_id, or None if the endpoint rejects it"""
+        if self._client is None:
+            raise RuntimeError("SessionDataClient.start() has not been called")
+        if not self.breaker.allow():
+            raise SessionServiceUnavailable("circuit open")
+
+        try:
+            async with self._semaphore:
+                response = await self._client.get(self.url, headers={"X-Session-ID": session_id})
+        except httpx.HTTPError as e:
+            self.breaker.record_failure()
+            logger.error(f"Session-data request failed: {str(e)}")
+            raise SessionServiceUnavailable(str(e))
+        except BaseException:
+            # Cancelled or crashed mid-request: still count it, or a half-open probe would stay
+            # claimed and the circuit would never close again
+            self.breaker.record_failure()
+            raise
+
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+            raise SessionServiceUnavailable(f"status {response.status_code}")
+
+        self.breaker.record_success()
+        if response.status_code != 200:
+            return None
+        return response.json()
+
+    def stats(self) -> Dict:
+        return {"url": self.url, "circuit": self.breaker.state, "consecutive_failures": self.breaker.failures}
@@ -0,0 +1,130 @@
+"""
+Keyset (cursor) pagination helpers for House of Neelam listings
+A cursor records the sort value and product_id of the last row served, so the next page is an
+index range scan instead of skip(n). Totals come from a short-lived count cache.
+"""
+
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import base64
+import json
+import os
+import time
+
+PRODUCT_COUNT_CACHE_TTL = int(os.environ.get('PRODUCT_COUNT_CACHE_TTL', '60'))
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        return datetime.fromisoformat(value["$date"])
+    return value
+
+
+def encode_cursor(sort_key: str, last_doc: Dict, sort_field: str, tiebreak: str = "product_id") -> str:
+    """Opaque cursor pointing just past last_doc in the given sort"""
+    payload = {"s": sort_key, "v": _encode_value(last_doc.get(sort_field)), "id": last_doc[tiebreak]}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_key: str) -> Tuple[Any, str]:
+    """Return (sort value, tiebreak id); the cursor must come from the same sort"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if payload["s"] != sort_key:
+            raise InvalidCursor("Cursor does not match the requested sort")
+        return _decode_value(payload["v"]), str(payload["id"])
+    except InvalidCursor:
+        raise
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+
+# MongoDB sorts values of different BSON types by type first (null lowest); these are the ones
+# our sort fields hold, in that order. Unmigrated databases mix string and date created_at.
+BSON_TYPE_ORDER = ["number", "string", "date"]
+
+
+def _bson_type(value: Any) -> Optional[str]:
+    if isinstance(value, datetime):
+        return "date"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return "number"
+    return None
+
+
+def keyset_filter(sort_field: str, sort_order: int, last_value: Any, last_id: str,
+                  tiebreak: str = "product_id") -> Dict:
+    """
+    Rows strictly after (last_value, last_id) in sort [(sort_field, order), (tiebreak, order)].
+    $lt/$gt only match values of the same BSON type, so rows of the types sorting after
+    last_value's type (and missing/null values, which sort lowest) are matched explicitly.
+    """
+    after_id = {tiebreak: {"$gt" if sort_order > 0 else "$lt": last_id}}
+    if last_value is None:
+        same_bucket = {"$and": [{sort_field: None}, after_id]}
+        if sort_order > 0:
+            return {"$or": [same_bucket, {sort_field: {"$ne": None}}]}
+        return same_bucket
+
+    clauses: List[Dict] = [
+        {sort_field: {"$gt" if sort_order > 0 else "$lt": last_value}},
+        {"$and": [{sort_field: last_value}, after_id]}
+    ]
+    value_type = _bson_type(last_value)
+    if value_type:
+        position = BSON_TYPE_ORDER.index(value_type)
+        later_types = BSON_TYPE_ORDER[position + 1:] if sort_order > 0 else BSON_TYPE_ORDER[:position]
+        clauses += [{sort_field: {"$type": later_type}} for later_type in later_types]
+    if sort_order < 0:
+        clauses.append({sort_field: None})
+    return {"$or": clauses}
+
+
+class CountCache:
+    """Short-lived count_documents results keyed by filter and catalog version"""
+
+    def __init__(self, ttl_seconds: int = PRODUCT_COUNT_CACHE_TTL, max_size: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+
+    @staticmethod
+    def key(query: Dict, version: Optional[int]) -> str:
+        return f"{version}:{json.dumps(query, sort_keys=True, default=str)}"
+
+    async def count(self, collection, query: Dict, version: Optional[int]) -> int:
+        key = self.key(query, version)
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry and entry[0] > now:
+            self._entries.move_to_end(key)
+            return entry[1]
+
+        total = await collection.count_documents(query)
+        if self.ttl_seconds > 0:
+            self._entries[key] = (now + self.ttl_seconds, total)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return total
+
+    def clear(self):
+        self._entries.clear()
+
+
+product_counts = CountCache()
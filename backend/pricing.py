@@ -0,0 +1,61 @@
+"""
+Server-side order pricing for House of Neelam
+Cart lines are priced from the catalog snapshot, and any products it does not have from one $in
+query, so a checkout costs at most one round trip whatever its size. Client-sent prices and
+names are never trusted.
+"""
+
+from typing import Dict, Iterable, List, Tuple
+
+from catalog_cache import catalog
+
+PRICE_PROJECTION = {"_id": 0, "product_id": 1, "name": 1, "price": 1, "images": 1}
+
+
+class UnknownProducts(Exception):
+    def __init__(self, missing: List[str]):
+        super().__init__(f"Unknown products: {', '.join(missing)}")
+        self.missing = missing
+
+
+async def price_table(db, product_ids: Iterable[str]) -> Dict[str, Dict]:
+    """product_id -> product (name, price, images) for every id that exists"""
+    ids = list(dict.fromkeys(product_ids))
+    table = {}
+    if catalog.ready:
+        for product_id in ids:
+            product = catalog.get(product_id)
+            if product is not None:
+                table[product_id] = product
+    # Without a snapshot, or for products it has not seen yet (created by another worker since the
+    # last poll): one query for the rest of the cart
+    misses = [product_id for product_id in ids if product_id not in table]
+    if misses:
+        products = await db.products.find({"product_id": {"$in": misses}}, PRICE_PROJECTION).to_list(None)
+        table.update((p["product_id"], p) for p in products)
+    return table
+
+
+def price_items(items: List[Dict], table: Dict[str, Dict]) -> Tuple[List[Dict], float]:
+    """Overwrite each line's price and name from the table; returns (items, total)"""
+    missing = [item["product_id"] for item in items if item["product_id"] not in table]
+    if missing:
+        raise UnknownProducts(list(dict.fromkeys(missing)))
+    priced = []
+    for item in items:
+        product = table[item["product_id"]]
+        images = product.get("images") or []
+        priced.append({
+            **item,
+            "name": product["name"],
+            "price": product["price"],
+            "image": images[0] if images else item.get("image", "")
+        })
+    total = round(sum(item["price"] * item["quantity"] for item in priced), 2)
+    return priced, total
+
+
+async def price_order(db, items: List[Dict]) -> Tuple[List[Dict], float]:
+    """Price a cart in at most one query; raises UnknownProducts"""
+    table = await price_table(db, (item["product_id"] for item in items))
+    return price_items(items, table)
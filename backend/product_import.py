@@ -0,0 +1,195 @@
+"""
+Bulk product import for House of Neelam
+Streams CSV or JSONL request bodies row by row, validates each row against ProductCreateEnhanced
+and applies them as batched, unordered bulk_write upserts. Rows are matched on product_id when
+given, otherwise on (name, category).
+"""
+
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+import codecs
+import csv
+import json
+import logging
+import os
+import uuid
+
+from enhanced_models import ProductCreateEnhanced
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', '1000'))
+MAX_REPORTED_ERRORS = 100
+
+# CSV cells holding lists use this separator
+LIST_SEPARATOR = "|"
+LIST_FIELDS = {"images", "tags"}
+
+
+class ImportReport:
+    def __init__(self):
+        self.processed = 0
+        self.inserted = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors: List[Dict] = []
+
+    def error(self, row: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": message})
+
+    def to_dict(self) -> Dict:
+        return {
+            "processed": self.processed,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors)
+        }
+
+
+# ---------- parsing ----------
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream into lines, keeping line endings"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def iter_jsonl_rows(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    """(line number, row, parse error) per non-blank line"""
+    row = 0
+    async for line in lines:
+        row += 1
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield row, None, f"Invalid JSON: {str(e)}"
+            continue
+        if not isinstance(data, dict):
+            yield row, None, "Expected a JSON object"
+            continue
+        yield row, data, None
+
+
+async def iter_csv_rows(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    """(data row number, row keyed by the header, parse error); quoted cells may span lines"""
+    header = None
+    record = ""
+    row = 0
+    async for line in lines:
+        record += line
+        # An odd number of quotes means a quoted cell continues on the next line
+        if record.count('"') % 2:
+            continue
+        text, record = record, ""
+        if not text.strip():
+            continue
+        cells = next(csv.reader([text]))
+        if header is None:
+            header = [cell.strip() for cell in cells]
+            continue
+        row += 1
+        if len(cells) != len(header):
+            yield row, None, f"Expected {len(header)} columns, got {len(cells)}"
+            continue
+        data = {}
+        for name, cell in zip(header, cells):
+            cell = cell.strip()
+            if cell == "":
+                continue
+            if name in LIST_FIELDS:
+                data[name] = [item.strip() for item in cell.split(LIST_SEPARATOR) if item.strip()]
+            else:
+                data[name] = cell
+        yield row, data, None
+    if record.strip():
+        yield row + 1, None, "Unterminated quoted cell"
+
+
+# ---------- validation ----------
+
+def validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in error.errors())
+
+
+def build_upsert(data: Dict, now: datetime) -> Tuple[str, UpdateOne]:
+    """Validate a row and turn it into (match key, upsert); raises ValidationError"""
+    product = ProductCreateEnhanced(**data)
+    fields = product.model_dump(exclude_unset=True)
+    fields["updated_at"] = now
+    on_insert = {"created_at": now, "rating": 0.0, "reviews_count": 0}
+
+    product_id = data.get("product_id")
+    if product_id:
+        match = {"product_id": str(product_id)}
+    else:
+        match = {"name": product.name, "category": product.category}
+        on_insert["product_id"] = f"prod_{uuid.uuid4().hex[:12]}"
+    key = json.dumps(match, sort_keys=True)
+    return key, UpdateOne(match, {"$set": fields, "$setOnInsert": on_insert}, upsert=True)
+
+
+# ---------- writing ----------
+
+async def _flush(collection, batch: List[Tuple[int, UpdateOne]], report: ImportReport):
+    try:
+        result = await collection.bulk_write([operation for _, operation in batch], ordered=False)
+        report.inserted += result.upserted_count
+        report.updated += result.matched_count
+    except BulkWriteError as e:
+        details = e.details
+        report.inserted += details.get("nUpserted", 0)
+        report.updated += details.get("nMatched", 0)
+        for write_error in details.get("writeErrors", []):
+            report.error(batch[write_error["index"]][0], write_error.get("errmsg", "Write failed"))
+
+
+async def import_products(collection, rows: AsyncIterator[Tuple[int, Optional[Dict], Optional[str]]],
+                          dry_run: bool = False, batch_size: int = IMPORT_BATCH_SIZE) -> ImportReport:
+    report = ImportReport()
+    now = datetime.now(timezone.utc)
+    # Keyed by match so a repeated row replaces the earlier one instead of racing it in the same
+    # unordered batch (two upserts on a new key could both insert)
+    batch: Dict[str, Tuple[int, UpdateOne]] = {}
+
+    async for row, data, parse_error in rows:
+        report.processed += 1
+        if parse_error:
+            report.error(row, parse_error)
+            continue
+        try:
+            key, operation = build_upsert(data, now)
+        except ValidationError as e:
+            report.error(row, validation_message(e))
+            continue
+        if dry_run:
+            continue
+        batch[key] = (row, operation)
+        if len(batch) >= batch_size:
+            await _flush(collection, list(batch.values()), report)
+            batch = {}
+
+    if batch:
+        await _flush(collection, list(batch.values()), report)
+
+    logger.info(
+        f"Product import{' (dry run)' if dry_run else ''}: {report.processed} rows, "
+        f"{report.inserted} inserted, {report.updated} updated, {report.failed} failed"
+    )
+    return report
@@ -0,0 +1,35 @@
+"""
+Schema version markers for House of Neelam
+Legacy rows stored timestamps as ISO strings. Once scripts/migrate_datetimes.py has rewritten them
+to native dates it sets a marker in db.schema_meta, and handlers stop parsing timestamps per row.
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable
+import logging
+
+logger = logging.getLogger(__name__)
+
+DATETIME_MARKER = {"_id": "datetimes"}
+DATETIME_SCHEMA_VERSION = 1
+
+# Set on startup from db.schema_meta
+datetimes_normalized = False
+
+
+async def load_schema_state(db):
+    global datetimes_normalized
+    marker = await db.schema_meta.find_one(DATETIME_MARKER)
+    datetimes_normalized = bool(marker and marker.get("version", 0) >= DATETIME_SCHEMA_VERSION)
+    if not datetimes_normalized:
+        logger.info("Datetime migration not applied; parsing legacy string timestamps on read")
+
+
+def parse_legacy_datetimes(docs: Iterable[Dict], *fields: str):
+    """Convert ISO-string timestamps in place; a no-op once the datetime migration has run"""
+    if datetimes_normalized:
+        return
+    for doc in docs:
+        for field in fields:
+            if isinstance(doc.get(field), str):
+                doc[field] = datetime.fromisoformat(doc[field])
@@ -0,0 +1,195 @@
+"""
+In-process full-text product search for House of Neelam
+An inverted index over product fields with BM25 ranking. It is fed by catalog snapshot
+listeners, so every product write updates the postings of that one product.
+Query terms missing from the vocabulary are expanded to close spellings (see fuzzy_match.py).
+Ranking runs on the event loop and costs tens of milliseconds for common words in a large
+catalog, so results are cached per normalized query until the next product write.
+"""
+
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+import heapq
+import math
+import os
+import re
+
+from fuzzy_match import TrigramVocabulary
+
+# Ranked queries kept until the index next changes (0 disables the cache)
+SEARCH_CACHE_SIZE = int(os.environ.get('SEARCH_CACHE_SIZE', '1024'))
+
+# Field weights (BM25F-style: term frequencies are scaled per field before saturation)
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "tags": 2.0,
+    "category": 2.0,
+    "subcategory": 1.5,
+    "material": 1.5,
+    "description": 1.0,
+}
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def normalize_token(token: str) -> str:
+    """Fold simple plurals so "rings" finds "ring" and "earrings" finds "earring" """
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [normalize_token(t) for t in _TOKEN.findall(text.lower())]
+
+
+def field_text(doc: Dict, field: str) -> str:
+    value = doc.get(field)
+    if not value:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return " ".join(str(v) for v in value)
+    return str(value)
+
+
+class SearchIndex:
+    def __init__(self, k1: float = 1.2, b: float = 0.75, cache_size: int = SEARCH_CACHE_SIZE):
+        self.k1 = k1
+        self.b = b
+        self.cache_size = cache_size
+        # (query terms, fuzzy, limit) -> (expanded query, matches); emptied on every index change
+        self._results: "OrderedDict[Tuple, Tuple[Dict, List[Tuple[str, float]]]]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # term -> {product_id: weighted term frequency}
+        self.postings: Dict[str, Dict[str, float]] = {}
+        self.doc_lengths: Dict[str, float] = {}
+        self.doc_terms: Dict[str, Tuple[str, ...]] = {}
+        self.total_length = 0.0
+        self.vocabulary = TrigramVocabulary()
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    # ---------- maintenance ----------
+
+    def add(self, product_id: str, doc: Dict):
+        self.remove(product_id)
+        if self._results:
+            self._results.clear()
+        frequencies: Counter = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in tokenize(field_text(doc, field)):
+                frequencies[term] += weight
+        length = sum(frequencies.values())
+        for term, frequency in frequencies.items():
+            if term not in self.postings:
+                self.postings[term] = {}
+                self.vocabulary.add(term)
+            self.postings[term][product_id] = frequency
+        self.doc_lengths[product_id] = length
+        self.doc_terms[product_id] = tuple(frequencies)
+        self.total_length += length
+
+    def remove(self, product_id: str):
+        length = self.doc_lengths.pop(product_id, None)
+        if length is None:
+            return
+        if self._results:
+            self._results.clear()
+        self.total_length -= length
+        for term in self.doc_terms.pop(product_id, ()):
+            docs = self.postings[term]
+            del docs[product_id]
+            if not docs:
+                del self.postings[term]
+                self.vocabulary.remove(term)
+
+    def on_catalog_change(self, product_id: str, doc: Optional[Dict]):
+        """Catalog snapshot listener"""
+        if doc is None:
+            self.remove(product_id)
+        else:
+            self.add(product_id, doc)
+
+    # ---------- queries ----------
+
+    def expand_query(self, query: str, fuzzy: Optional[bool] = None) -> Dict[str, List[Tuple[str, float]]]:
+        """
+        Map each query term to the (index term, weight) pairs it searches for.
+        fuzzy=None: only terms missing from the index are expanded; True: always add close
+        spellings; False: exact terms only.
+        """
+        expanded = {}
+        for term in dict.fromkeys(tokenize(query)):
+            known = term in self.postings
+            alternatives = [(term, 1.0)] if known else []
+            if fuzzy or (fuzzy is None and not known):
+                alternatives += [(near, 0.5 ** distance) for near, distance in self.vocabulary.neighbours(term)]
+            expanded[term] = alternatives
+        return expanded
+
+    def rank(self, expanded: Dict[str, List[Tuple[str, float]]], limit: Optional[int] = 20) -> List[Tuple[str, float]]:
+        """(product_id, score) pairs, best first"""
+        scores = self.score_terms(pair for alternatives in expanded.values() for pair in alternatives)
+        ranked = ((score, pid) for pid, score in scores.items())
+        if limit is None:
+            top = sorted(ranked, reverse=True)
+        else:
+            top = heapq.nlargest(limit, ranked)
+        return [(pid, score) for score, pid in top]
+
+    def query(self, query: str, limit: Optional[int] = 20,
+              fuzzy: Optional[bool] = None) -> Tuple[Dict[str, List[Tuple[str, float]]], List[Tuple[str, float]]]:
+        """(expanded query, matches) for a query string, cached until the index changes; treat both as read-only"""
+        key = (tuple(dict.fromkeys(tokenize(query))), fuzzy, limit)
+        cached = self._results.get(key)
+        if cached is not None:
+            self._results.move_to_end(key)
+            self.cache_hits += 1
+            return cached
+        self.cache_misses += 1
+        expanded = self.expand_query(query, fuzzy)
+        result = (expanded, self.rank(expanded, limit))
+        if self.cache_size > 0:
+            self._results[key] = result
+            if len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+        return result
+
+    def search(self, query: str, limit: Optional[int] = 20, fuzzy: Optional[bool] = None) -> List[Tuple[str, float]]:
+        return self.query(query, limit, fuzzy)[1]
+
+    def score_terms(self, terms: Iterable[Tuple[str, float]]) -> Dict[str, float]:
+        """BM25 scores for (term, weight) pairs; weight scales a term's contribution"""
+        count = len(self.doc_lengths)
+        if not count:
+            return {}
+        average_length = self.total_length / count or 1.0
+        lengths = self.doc_lengths
+        # norm(d) = k1 * (1 - b + b * |d| / avgdl), split into constant and per-length parts
+        base = self.k1 * (1 - self.b)
+        per_length = self.k1 * self.b / average_length
+        saturation = self.k1 + 1
+        scores: Dict[str, float] = {}
+        get = scores.get
+        for term, term_weight in terms:
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+            weight = idf * saturation * term_weight
+            for product_id, frequency in docs.items():
+                scores[product_id] = get(product_id, 0.0) + weight * frequency / (frequency + base + per_length * lengths[product_id])
+        return scores
+
+    def stats(self) -> Dict:
+        return {
+            "documents": len(self.doc_lengths),
+            "terms": len(self.postings),
+            "result_cache": {"entries": len(self._results), "hits": self.cache_hits, "misses": self.cache_misses},
+            "fuzzy_vocabulary": self.vocabulary.stats()
+        }
+
+
+search_index = SearchIndex()
@@ -1,4 +1,4 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Request, Response, Cookie, Header
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Query, Request, Response, Cookie
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
@@ -10,10 +10,29 @@ from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
 from typing import List, Optional, Dict
 import uuid
-from datetime import datetime, timezone, timedelta
+import asyncio
+from datetime import datetime, timezone
 import bcrypt
-import httpx
 import razorpay
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from auth_workers import AuthWorkerPool, LoginThrottle, PoolSaturated, TrustedProxies
+from oauth_client import CircuitBreaker, SessionDataClient, SessionServiceUnavailable
+from db_indexes import ensure_indexes
+from schema_version import load_schema_state, parse_legacy_datetimes
+from catalog_cache import catalog
+from facets import facet_cache
+from search_index import search_index
+from suggest_index import suggest_index
+from http_cache import conditional_response
+import fast_json
+import inventory
+import pricing
+from fast_json import fast_json_response, model_projection, trusted_rows
+from sparse_fields import order_fields, product_fields
+from pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_filter
+import auth
+from auth import User, current_user, require_user, require_admin, create_session, end_session, refresh_user_sessions, session_cache
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -28,6 +47,42 @@ RAZORPAY_KEY_ID = os.environ['RAZORPAY_KEY_ID']
 RAZORPAY_KEY_SECRET = os.environ['RAZORPAY_KEY_SECRET']
 razorpay_client = razorpay.Client(auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET))
 
+# Legacy-session sweeper cadence (TTL index handles rows with date expiry)
+SESSION_SWEEP_INTERVAL = float(os.environ.get('SESSION_SWEEP_INTERVAL', '3600'))
+
+# GET /api/products returns at most this many products (paginate with /api/products/enhanced)
+PRODUCT_LIST_LIMIT = 1000
+
+# Default page size for a customer's order history
+ORDER_PAGE_SIZE = int(os.environ.get('ORDER_PAGE_SIZE', '20'))
+
+# Password verification runs off the event loop; login attempts are throttled per client IP
+auth_pool = AuthWorkerPool(
+    max_workers=int(os.environ.get('AUTH_POOL_WORKERS', '2')),
+    max_queue=int(os.environ.get('AUTH_POOL_QUEUE', '16'))
+)
+login_throttle = LoginThrottle(
+    max_attempts=int(os.environ.get('LOGIN_MAX_ATTEMPTS', '10')),
+    window_seconds=float(os.environ.get('LOGIN_WINDOW_SECONDS', '300'))
+)
+# Only these peers (the reverse proxy) may name the client with X-Real-IP
+trusted_proxies = TrustedProxies(os.environ.get('TRUSTED_PROXIES', '127.0.0.1,::1').split(','))
+
+# Emergent OAuth session-data client (pooled for the app lifetime, opened on startup)
+session_data_client = SessionDataClient(
+    url=os.environ.get('EMERGENT_SESSION_DATA_URL', "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data"),
+    connect_timeout=float(os.environ.get('SESSION_DATA_CONNECT_TIMEOUT', '3')),
+    read_timeout=float(os.environ.get('SESSION_DATA_READ_TIMEOUT', '5')),
+    max_concurrency=int(os.environ.get('SESSION_DATA_MAX_CONCURRENCY', '20')),
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.environ.get('SESSION_DATA_BREAKER_FAILURES', '5')),
+        reset_timeout=float(os.environ.get('SESSION_DATA_BREAKER_RESET', '30'))
+    )
+)
+
+# Long-running tasks started on startup and cancelled on shutdown
+background_tasks: List[asyncio.Task] = []
+
 # Create the main app
 app = FastAPI()
 api_router = APIRouter(prefix="/api")
@@ -36,6 +91,8 @@ api_router = APIRouter(prefix="/api")
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+auth.init_auth(db)
+
 # Import and initialize enhanced routes
 try:
     from upload_handler import router as upload_router
@@ -57,16 +114,6 @@ except Exception as e:
 
 # ============ MODELS ============
 
-class User(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    user_id: str
-    email: str
-    name: str
-    picture: Optional[str] = None
-    role: str = "customer"
-    phone: Optional[str] = None
-    created_at: datetime
-
 class AdminLoginRequest(BaseModel):
     email: str
     password: str
@@ -123,6 +170,15 @@ class Order(BaseModel):
     created_at: datetime
     updated_at: datetime
 
+class OrderSummary(BaseModel):
+    """A row of GET /api/orders: the "history" preset, or whichever fields were asked for"""
+    order_id: str
+    items: Optional[List[OrderItem]] = None
+    total_amount: Optional[float] = None
+    status: Optional[str] = None
+    payment_status: Optional[str] = None
+    created_at: Optional[datetime] = None
+
 class OrderCreate(BaseModel):
     items: List[OrderItem]
     guest_phone: Optional[str] = None
@@ -137,52 +193,50 @@ class CheckoutRequest(BaseModel):
 
 # ============ AUTH HELPERS ============
 
-async def get_current_user(authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)) -> Optional[User]:
-    """Extract user from session_token (cookie first, then Authorization header)"""
-    token = session_token or (authorization.replace('Bearer ', '') if authorization else None)
-    if not token:
-        return None
-    
-    session = await db.user_sessions.find_one({"session_token": token}, {"_id": 0})
-    if not session:
-        return None
-    
-    expires_at = session["expires_at"]
-    if isinstance(expires_at, str):
-        expires_at = datetime.fromisoformat(expires_at)
-    if expires_at.tzinfo is None:
-        expires_at = expires_at.replace(tzinfo=timezone.utc)
-    if expires_at < datetime.now(timezone.utc):
-        return None
-    
-    user_doc = await db.users.find_one({"user_id": session["user_id"]}, {"_id": 0})
-    if not user_doc:
-        return None
-    
-    if isinstance(user_doc['created_at'], str):
-        user_doc['created_at'] = datetime.fromisoformat(user_doc['created_at'])
-    
-    return User(**user_doc)
-
-async def get_admin_user(authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)) -> User:
-    user = await get_current_user(authorization, session_token)
-    if not user or user.role != "admin":
-        raise HTTPException(status_code=403, detail="Admin access required")
-    return user
+async def sweep_expired_sessions_loop():
+    """Delete expired sessions the TTL index cannot see (legacy rows with ISO-string expires_at)"""
+    while True:
+        try:
+            now = datetime.now(timezone.utc)
+            result = await db.user_sessions.delete_many({
+                "expires_at": {"$type": "string", "$lt": now.isoformat()}
+            })
+            if result.deleted_count:
+                logger.info(f"Swept {result.deleted_count} expired legacy sessions")
+        except Exception as e:
+            logger.error(f"Session sweep error: {str(e)}")
+        await asyncio.sleep(SESSION_SWEEP_INTERVAL)
 
 # ============ AUTH ROUTES ============
 
 @api_router.post("/admin/login")
-async def admin_login(request: AdminLoginRequest, response: Response):
+async def admin_login(request: AdminLoginRequest, response: Response, http_request: Request):
     """Admin login with email/password"""
     admin_email = os.environ.get('ADMIN_EMAIL')
     admin_password_hash = os.environ.get('ADMIN_PASSWORD_HASH')
     
+    client_ip = trusted_proxies.client_ip(
+        http_request.client.host if http_request.client else None,
+        http_request.headers.get('X-Real-IP')
+    )
+    retry_after = login_throttle.hit(client_ip)
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many login attempts",
+            headers={"Retry-After": str(int(retry_after) + 1)}
+        )
+    
     if request.email != admin_email:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    if not bcrypt.checkpw(request.password.encode(), admin_password_hash.encode()):
+    try:
+        password_ok = await auth_pool.run(bcrypt.checkpw, request.password.encode(), admin_password_hash.encode())
+    except PoolSaturated:
+        raise HTTPException(status_code=503, detail="Login temporarily unavailable", headers={"Retry-After": "1"})
+    if not password_ok:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    login_throttle.reset(client_ip)
     
     # Check if admin user exists
     admin_user = await db.users.find_one({"email": admin_email}, {"_id": 0})
@@ -201,23 +255,7 @@ async def admin_login(request: AdminLoginRequest, response: Response):
         user_id = admin_user["user_id"]
     
     # Create session
-    session_token = f"session_{uuid.uuid4().hex}"
-    await db.user_sessions.insert_one({
-        "user_id": user_id,
-        "session_token": session_token,
-        "expires_at": datetime.now(timezone.utc) + timedelta(days=7),
-        "created_at": datetime.now(timezone.utc)
-    })
-    
-    response.set_cookie(
-        key="session_token",
-        value=session_token,
-        httponly=True,
-        secure=True,
-        samesite="none",
-        max_age=7*24*60*60,
-        path="/"
-    )
+    await create_session(response, admin_user)
     
     return {"user_id": user_id, "email": admin_email, "name": "Admin", "role": "admin"}
 
@@ -225,15 +263,12 @@ async def admin_login(request: AdminLoginRequest, response: Response):
 async def process_session(session_id: str, response: Response):
     """Process Emergent OAuth session_id and create user session"""
     # REMINDER: DO NOT HARDCODE THE URL, OR ADD ANY FALLBACKS OR REDIRECT URLS, THIS BREAKS THE AUTH
-    async with httpx.AsyncClient() as http_client:
-        auth_response = await http_client.get(
-            "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data",
-            headers={"X-Session-ID": session_id}
-        )
-        if auth_response.status_code != 200:
-            raise HTTPException(status_code=401, detail="Invalid session")
-        
-        user_data = auth_response.json()
+    try:
+        user_data = await session_data_client.fetch(session_id)
+    except SessionServiceUnavailable:
+        raise HTTPException(status_code=503, detail="Authentication service unavailable")
+    if not user_data:
+        raise HTTPException(status_code=401, detail="Invalid session")
     
     # Check if user exists
     existing_user = await db.users.find_one({"email": user_data["email"]}, {"_id": 0})
@@ -243,119 +278,118 @@ async def process_session(session_id: str, response: Response):
             {"user_id": user_id},
             {"$set": {"name": user_data["name"], "picture": user_data["picture"]}}
         )
+        await refresh_user_sessions(user_id, {"name": user_data["name"], "picture": user_data["picture"]})
+        user_doc = {**existing_user, "name": user_data["name"], "picture": user_data["picture"]}
     else:
         user_id = f"user_{uuid.uuid4().hex[:12]}"
-        await db.users.insert_one({
+        user_doc = {
             "user_id": user_id,
             "email": user_data["email"],
             "name": user_data["name"],
             "picture": user_data["picture"],
             "role": "customer",
             "created_at": datetime.now(timezone.utc)
-        })
-    
-    # Create session using session_token from Emergent
-    session_token = user_data["session_token"]
-    await db.user_sessions.insert_one({
-        "user_id": user_id,
-        "session_token": session_token,
-        "expires_at": datetime.now(timezone.utc) + timedelta(days=7),
-        "created_at": datetime.now(timezone.utc)
-    })
+        }
+        await db.users.insert_one(user_doc.copy())
     
-    response.set_cookie(
-        key="session_token",
-        value=session_token,
-        httponly=True,
-        secure=True,
-        samesite="none",
-        max_age=7*24*60*60,
-        path="/"
-    )
+    # Create session using session_token from Emergent (replaced by a signed token in signed mode)
+    await create_session(response, user_doc, user_data["session_token"])
     
     return {"user_id": user_id, "email": user_data["email"], "name": user_data["name"], "role": "customer"}
 
 @api_router.post("/auth/guest")
 async def guest_auth(request: GuestAuthRequest, response: Response):
     """Guest authentication with phone number"""
-    guest_user = await db.users.find_one({"phone": request.phone, "role": "guest"}, {"_id": 0})
-    
-    if guest_user:
-        user_id = guest_user["user_id"]
-    else:
-        user_id = f"user_{uuid.uuid4().hex[:12]}"
-        await db.users.insert_one({
-            "user_id": user_id,
-            "phone": request.phone,
-            "email": f"guest_{user_id}@houseofneelam.com",
-            "name": "Guest",
-            "role": "guest",
-            "created_at": datetime.now(timezone.utc)
-        })
-    
-    session_token = f"session_{uuid.uuid4().hex}"
-    await db.user_sessions.insert_one({
-        "user_id": user_id,
-        "session_token": session_token,
-        "expires_at": datetime.now(timezone.utc) + timedelta(days=7),
-        "created_at": datetime.now(timezone.utc)
-    })
+    # Single upsert backed by the unique (phone, role=guest) index, so concurrent checkouts share one guest
+    guest_filter = {"phone": request.phone, "role": "guest"}
+    new_user_id = f"user_{uuid.uuid4().hex[:12]}"
+    try:
+        guest_user = await db.users.find_one_and_update(
+            guest_filter,
+            {"$setOnInsert": {
+                "user_id": new_user_id,
+                "email": f"guest_{new_user_id}@houseofneelam.com",
+                "name": "Guest",
+                "created_at": datetime.now(timezone.utc)
+            }},
+            projection={"_id": 0},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # A concurrent request inserted the same guest first
+        guest_user = await db.users.find_one(guest_filter, {"_id": 0})
+    user_id = guest_user["user_id"]
     
-    response.set_cookie(
-        key="session_token",
-        value=session_token,
-        httponly=True,
-        secure=True,
-        samesite="none",
-        max_age=7*24*60*60,
-        path="/"
-    )
+    await create_session(response, guest_user)
     
     return {"user_id": user_id, "phone": request.phone, "role": "guest"}
 
 @api_router.get("/auth/me")
-async def get_me(authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)):
-    user = await get_current_user(authorization, session_token)
-    if not user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
+async def get_me(user: User = Depends(require_user)):
     return user
 
 @api_router.post("/auth/logout")
 async def logout(response: Response, session_token: Optional[str] = Cookie(None)):
     if session_token:
-        await db.user_sessions.delete_one({"session_token": session_token})
+        await end_session(session_token)
     response.delete_cookie("session_token", path="/")
     return {"message": "Logged out successfully"}
 
 # ============ PRODUCT ROUTES ============
 
 @api_router.get("/products", response_model=List[Product])
-async def get_products(category: Optional[str] = None):
+async def get_products(request: Request, response: Response, category: Optional[str] = None,
+                       fields: Optional[str] = None):
+    """fields: "card" or a comma-separated field list for a partial response"""
+    field_set = product_fields(fields)
+    cached = conditional_response(request, response, catalog.version)
+    if cached:
+        return cached
+    
+    if catalog.ready:
+        products = catalog.list(category, in_stock=True, limit=PRODUCT_LIST_LIMIT)
+        if field_set:
+            return fast_json_response(field_set.select_all(products), response)
+        if fast_json.FAST_JSON_RESPONSES:
+            return fast_json_response(trusted_rows(Product, products), response)
+        return products
+    
     query = {"stock": {"$gt": 0}}
     if category:
         query["category"] = category
-    products = await db.products.find(query, {"_id": 0}).to_list(1000)
-    for product in products:
-        if isinstance(product['created_at'], str):
-            product['created_at'] = datetime.fromisoformat(product['created_at'])
-        if isinstance(product['updated_at'], str):
-            product['updated_at'] = datetime.fromisoformat(product['updated_at'])
+    if field_set:
+        products = await db.products.find(query, field_set.projection()).to_list(PRODUCT_LIST_LIMIT)
+        parse_legacy_datetimes(products, 'created_at', 'updated_at')
+        return fast_json_response(products, response)
+    if fast_json.FAST_JSON_RESPONSES:
+        products = await db.products.find(query, model_projection(Product)).to_list(PRODUCT_LIST_LIMIT)
+        return fast_json_response(trusted_rows(Product, products), response)
+    products = await db.products.find(query, {"_id": 0}).to_list(PRODUCT_LIST_LIMIT)
+    parse_legacy_datetimes(products, 'created_at', 'updated_at')
     return products
 
 @api_router.get("/products/{product_id}", response_model=Product)
-async def get_product(product_id: str):
-    product = await db.products.find_one({"product_id": product_id}, {"_id": 0})
+async def get_product(product_id: str, request: Request, response: Response):
+    if catalog.ready:
+        product = catalog.get(product_id)
+        if product:
+            cached = conditional_response(request, response, catalog.version)
+            if cached:
+                return cached
+            return product
+    
+    # Not in the snapshot yet (created by another worker since the last poll) or no snapshot
+    product = await db.products.find_one({"product_id": product_id}, inventory.PUBLIC_PRODUCT_PROJECTION)
+    if product and catalog.ready:
+        catalog.upsert(product)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    if isinstance(product['created_at'], str):
-        product['created_at'] = datetime.fromisoformat(product['created_at'])
-    if isinstance(product['updated_at'], str):
-        product['updated_at'] = datetime.fromisoformat(product['updated_at'])
+    parse_legacy_datetimes([product], 'created_at', 'updated_at')
     return Product(**product)
 
 @api_router.post("/admin/products", response_model=Product)
-async def create_product(product: ProductCreate, authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)):
-    admin = await get_admin_user(authorization, session_token)
+async def create_product(product: ProductCreate, admin: User = Depends(require_admin)):
     product_id = f"prod_{uuid.uuid4().hex[:12]}"
     now = datetime.now(timezone.utc)
     product_data = product.model_dump()
@@ -365,41 +399,55 @@ async def create_product(product: ProductCreate, authorization: Optional[str] =
         "updated_at": now
     })
     await db.products.insert_one(product_data.copy())
+    catalog.upsert(product_data)
+    await catalog.bump_version(db)
     return Product(**product_data)
 
 @api_router.put("/admin/products/{product_id}", response_model=Product)
-async def update_product(product_id: str, product: ProductUpdate, authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)):
-    admin = await get_admin_user(authorization, session_token)
-    existing = await db.products.find_one({"product_id": product_id}, {"_id": 0})
-    if not existing:
-        raise HTTPException(status_code=404, detail="Product not found")
-    
+async def update_product(product_id: str, product: ProductUpdate, admin: User = Depends(require_admin)):
     update_data = {k: v for k, v in product.model_dump().items() if v is not None}
     update_data["updated_at"] = datetime.now(timezone.utc)
-    
-    await db.products.update_one({"product_id": product_id}, {"$set": update_data})
-    updated = await db.products.find_one({"product_id": product_id}, {"_id": 0})
-    if isinstance(updated['created_at'], str):
-        updated['created_at'] = datetime.fromisoformat(updated['created_at'])
-    if isinstance(updated['updated_at'], str):
-        updated['updated_at'] = datetime.fromisoformat(updated['updated_at'])
+    # Flash-sale counters hold stock the product document has not seen yet
+    flash_stock = "stock" in update_data and product_id in inventory.flash_sale.product_ids
+    if flash_stock:
+        await inventory.flash_sale.flush(db)
+    
+    updated = await db.products.find_one_and_update(
+        {"product_id": product_id},
+        {"$set": update_data},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if not updated:
+        raise HTTPException(status_code=404, detail="Product not found")
+    catalog.upsert(updated)
+    await catalog.bump_version(db)
+    if flash_stock:
+        await inventory.flash_sale.load(db)
+    parse_legacy_datetimes([updated], 'created_at', 'updated_at')
     return Product(**updated)
 
 @api_router.delete("/admin/products/{product_id}")
-async def delete_product(product_id: str, authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)):
-    admin = await get_admin_user(authorization, session_token)
+async def delete_product(product_id: str, admin: User = Depends(require_admin)):
     result = await db.products.delete_one({"product_id": product_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
+    catalog.remove(product_id)
+    await catalog.bump_version(db)
     return {"message": "Product deleted successfully"}
 
 # ============ ORDER ROUTES ============
 
 @api_router.post("/orders", response_model=Order)
-async def create_order(order: OrderCreate, authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)):
-    user = await get_current_user(authorization, session_token)
+async def create_order(order: OrderCreate, user: Optional[User] = Depends(current_user)):
+    if not order.items or any(item.quantity < 1 for item in order.items):
+        raise HTTPException(status_code=400, detail="Order items need a quantity of at least 1")
     
-    total_amount = sum(item.price * item.quantity for item in order.items)
+    # Prices come from the catalog, never from the client
+    try:
+        items, total_amount = await pricing.price_order(db, [item.model_dump() for item in order.items])
+    except pricing.UnknownProducts as e:
+        raise HTTPException(status_code=400, detail=str(e))
     order_id = f"order_{uuid.uuid4().hex[:12]}"
     now = datetime.now(timezone.utc)
     
@@ -408,7 +456,7 @@ async def create_order(order: OrderCreate, authorization: Optional[str] = Header
         "user_id": user.user_id if user else None,
         "guest_phone": order.guest_phone,
         "guest_email": order.guest_email,
-        "items": [item.model_dump() for item in order.items],
+        "items": items,
         "total_amount": total_amount,
         "status": "pending",
         "payment_status": "pending",
@@ -416,26 +464,57 @@ async def create_order(order: OrderCreate, authorization: Optional[str] = Header
         "updated_at": now
     }
     
-    await db.orders.insert_one(order_data.copy())
+    # Hold stock before the order exists so two checkouts cannot both get the last unit
+    try:
+        reservation = await inventory.reserve(db, order_id, order_data["items"])
+    except inventory.InsufficientStock as e:
+        if e.missing:
+            raise HTTPException(status_code=400, detail=f"Unknown products: {', '.join(e.missing)}")
+        names = [item["name"] for item in items if item["product_id"] in e.unavailable]
+        raise HTTPException(status_code=409, detail=f"Not enough stock for: {', '.join(names)}")
+    
+    try:
+        await db.orders.insert_one(order_data.copy())
+    except Exception:
+        await inventory.release(db, order_id)
+        raise
     return Order(**order_data)
 
-@api_router.get("/orders", response_model=List[Order])
-async def get_user_orders(authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)):
-    user = await get_current_user(authorization, session_token)
-    if not user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    orders = await db.orders.find({"user_id": user.user_id}, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    for order in orders:
-        if isinstance(order['created_at'], str):
-            order['created_at'] = datetime.fromisoformat(order['created_at'])
-        if isinstance(order['updated_at'], str):
-            order['updated_at'] = datetime.fromisoformat(order['updated_at'])
-    return orders
+@api_router.get("/orders", response_model=List[OrderSummary])
+async def get_user_orders(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(ORDER_PAGE_SIZE, ge=1, le=100),
+    fields: Optional[str] = None,
+    user: User = Depends(require_user)
+):
+    """Order history, newest first, as summaries (fields="history" unless given)
+    
+    When there may be more orders the X-Next-Cursor header is set; pass it back as `cursor` for the
+    next page. GET /api/orders/{order_id} returns the full order.
+    """
+    field_set = order_fields(fields or "history")
+    query = {"user_id": user.user_id}
+    if cursor:
+        try:
+            last_value, last_id = decode_cursor(cursor, "newest")
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = {"$and": [query, keyset_filter("created_at", -1, last_value, last_id, tiebreak="order_id")]}
+    
+    # The cursor needs created_at even when the caller did not ask for it
+    orders = await db.orders.find(query, field_set.projection("created_at")) \
+        .sort([("created_at", -1), ("order_id", -1)]).limit(limit).to_list(limit)
+    if len(orders) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor("newest", orders[-1], "created_at", tiebreak="order_id")
+    if "created_at" not in field_set.fields:
+        for order in orders:
+            order.pop("created_at", None)
+    parse_legacy_datetimes(orders, 'created_at', 'updated_at')
+    return fast_json_response(orders, response)
 
 @api_router.get("/orders/{order_id}", response_model=Order)
-async def get_order(order_id: str, authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)):
-    user = await get_current_user(authorization, session_token)
+async def get_order(order_id: str, user: Optional[User] = Depends(current_user)):
     order = await db.orders.find_one({"order_id": order_id}, {"_id": 0})
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
@@ -443,33 +522,38 @@ async def get_order(order_id: str, authorization: Optional[str] = Header(None),
     if user and user.role != "admin" and order.get("user_id") != user.user_id:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    if isinstance(order['created_at'], str):
-        order['created_at'] = datetime.fromisoformat(order['created_at'])
-    if isinstance(order['updated_at'], str):
-        order['updated_at'] = datetime.fromisoformat(order['updated_at'])
+    parse_legacy_datetimes([order], 'created_at', 'updated_at')
     return Order(**order)
 
 @api_router.get("/admin/orders", response_model=List[Order])
-async def get_all_orders(authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)):
-    admin = await get_admin_user(authorization, session_token)
+async def get_all_orders(fields: Optional[str] = None, admin: User = Depends(require_admin)):
+    """fields: "summary" or a comma-separated field list for a partial response"""
+    field_set = order_fields(fields)
+    if field_set:
+        orders = await db.orders.find({}, field_set.projection()).sort("created_at", -1).to_list(1000)
+        parse_legacy_datetimes(orders, 'created_at', 'updated_at')
+        return fast_json_response(orders)
+    
+    if fast_json.FAST_JSON_RESPONSES:
+        orders = await db.orders.find({}, model_projection(Order)).sort("created_at", -1).to_list(1000)
+        return fast_json_response(trusted_rows(Order, orders))
+    
     orders = await db.orders.find({}, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    for order in orders:
-        if isinstance(order['created_at'], str):
-            order['created_at'] = datetime.fromisoformat(order['created_at'])
-        if isinstance(order['updated_at'], str):
-            order['updated_at'] = datetime.fromisoformat(order['updated_at'])
+    parse_legacy_datetimes(orders, 'created_at', 'updated_at')
     return orders
 
 @api_router.put("/admin/orders/{order_id}")
-async def update_order_status(order_id: str, status_update: OrderStatusUpdate, authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)):
-    admin = await get_admin_user(authorization, session_token)
-    result = await db.orders.update_one(
+async def update_order_status(order_id: str, status_update: OrderStatusUpdate, admin: User = Depends(require_admin)):
+    order = await db.orders.find_one_and_update(
         {"order_id": order_id},
-        {"$set": {"status": status_update.status, "updated_at": datetime.now(timezone.utc)}}
+        {"$set": {"status": status_update.status, "updated_at": datetime.now(timezone.utc)}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
     )
-    if result.matched_count == 0:
+    if not order:
         raise HTTPException(status_code=404, detail="Order not found")
-    return {"message": "Order updated successfully"}
+    parse_legacy_datetimes([order], 'created_at', 'updated_at')
+    return {"message": "Order updated successfully", "order": Order(**order)}
 
 # ============ RAZORPAY PAYMENT ROUTES ============
 
@@ -487,6 +571,8 @@ async def create_razorpay_order(request: RazorpayOrderRequest):
     order = await db.orders.find_one({"order_id": request.order_id}, {"_id": 0})
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
+    if order.get("status") == "cancelled":
+        raise HTTPException(status_code=409, detail="Order expired; please place it again")
     
     # Convert amount to paise (Razorpay uses smallest currency unit)
     amount_in_paise = int(order["total_amount"] * 100)
@@ -559,7 +645,7 @@ async def verify_razorpay_payment(payment_data: RazorpayVerifyRequest):
                 }}
             )
             
-            # Update order
+            # Update order and make its stock hold permanent
             await db.orders.update_one(
                 {"razorpay_order_id": payment_data.razorpay_order_id},
                 {"$set": {
@@ -568,6 +654,12 @@ async def verify_razorpay_payment(payment_data: RazorpayVerifyRequest):
                     "updated_at": datetime.now(timezone.utc)
                 }}
             )
+            if not await inventory.commit(db, transaction["order_id"]):
+                # Paid after the hold expired and the stock sold out meanwhile
+                await db.orders.update_one(
+                    {"order_id": transaction["order_id"]},
+                    {"$set": {"fulfillment_issue": "insufficient_stock"}}
+                )
         
         # Get updated order
         order = await db.orders.find_one(
@@ -609,8 +701,7 @@ async def get_razorpay_payment_status(razorpay_order_id: str):
 # ============ ADMIN DASHBOARD ============
 
 @api_router.get("/admin/dashboard/stats")
-async def get_dashboard_stats(authorization: Optional[str] = Header(None), session_token: Optional[str] = Cookie(None)):
-    admin = await get_admin_user(authorization, session_token)
+async def get_dashboard_stats(admin: User = Depends(require_admin)):
     
     total_orders = await db.orders.count_documents({})
     total_revenue = await db.orders.aggregate([
@@ -630,10 +721,48 @@ async def get_dashboard_stats(authorization: Optional[str] = Header(None), sessi
         "low_stock_items": low_stock
     }
 
+@api_router.get("/admin/system/session-cache")
+async def get_session_cache_stats(admin: User = Depends(require_admin)):
+    return session_cache.stats()
+
+@api_router.get("/admin/system/auth-pool")
+async def get_auth_pool_stats(admin: User = Depends(require_admin)):
+    return {"pool": auth_pool.stats(), "login_throttle": login_throttle.stats(), "session_data": session_data_client.stats()}
+
+@api_router.get("/admin/system/catalog")
+async def get_catalog_stats(admin: User = Depends(require_admin)):
+    return {
+        **catalog.stats(),
+        "facet_cache": facet_cache.stats(),
+        "search_index": search_index.stats(),
+        "suggest_index": suggest_index.stats()
+    }
+
+@api_router.get("/admin/system/flash-sale")
+async def get_flash_sale_stats(admin: User = Depends(require_admin)):
+    return inventory.flash_sale.stats()
+
+@api_router.post("/admin/system/flash-sale/reload")
+async def reload_flash_sale(admin: User = Depends(require_admin)):
+    """Flush pending holds and restart the counters from products.stock"""
+    await inventory.flash_sale.flush(db)
+    await inventory.flash_sale.load(db)
+    return inventory.flash_sale.stats()
+
 # ============ STARTUP - SEED DATA ============
 
 @app.on_event("startup")
 async def startup_event():
+    await session_data_client.start()
+    await ensure_indexes(db)
+    await load_schema_state(db)
+    background_tasks.append(asyncio.create_task(sweep_expired_sessions_loop()))
+    background_tasks.append(asyncio.create_task(inventory.release_expired_loop(db)))
+    
+    if auth.SESSION_SIGNING_SECRET:
+        await auth.revocation_list.sync(db)
+        background_tasks.append(asyncio.create_task(auth.sync_revocations_loop()))
+    
     # Check if products exist
     product_count = await db.products.count_documents({})
     if product_count == 0:
@@ -731,6 +860,14 @@ async def startup_event():
         ]
         await db.categories.insert_many(sample_categories)
         logger.info(f"Seeded {len(sample_categories)} categories")
+    
+    # Start after seeding so the first snapshot includes the sample catalog
+    background_tasks.append(asyncio.create_task(catalog.run(db)))
+    background_tasks.append(asyncio.create_task(catalog.run_stock_changes(db)))
+    
+    if inventory.flash_sale.product_ids:
+        await inventory.flash_sale.load(db)
+        background_tasks.append(asyncio.create_task(inventory.flash_sale.run(db)))
 
 app.include_router(api_router)
 
@@ -740,8 +877,17 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for task in background_tasks:
+        task.cancel()
+    try:
+        await inventory.flash_sale.flush(db)
+    except Exception as e:
+        logger.error(f"Flash-sale flush on shutdown failed: {str(e)}")
+    auth_pool.shutdown()
+    await session_data_client.close()
     client.close()
\ No newline at end of file
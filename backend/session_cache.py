@@ -0,0 +1,72 @@
+"""
+In-process session cache for House of Neelam
+Maps session tokens to resolved users so hot requests skip the session/user lookups
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import time
+
+
+class SessionCache:
+    """Bounded LRU cache of session_token -> user with per-entry expiry"""
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 60.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, token: str) -> Optional[Any]:
+        entry = self._entries.get(token)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        user, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[token]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return user
+
+    def set(self, token: str, user: Any, max_age: Optional[float] = None):
+        """Cache a user; max_age caps the TTL (e.g. seconds until the session expires)"""
+        ttl = self.ttl_seconds if max_age is None else min(self.ttl_seconds, max_age)
+        if ttl <= 0:
+            return
+
+        self._entries[token] = (user, time.monotonic() + ttl)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, token: str):
+        self._entries.pop(token, None)
+
+    def invalidate_user(self, user_id: str):
+        """Drop every cached session belonging to a user (profile or role change)"""
+        stale = [token for token, (user, _) in self._entries.items() if user.user_id == user_id]
+        for token in stale:
+            del self._entries[token]
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
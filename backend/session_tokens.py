@@ -0,0 +1,133 @@
+"""
+Stateless signed session tokens for House of Neelam
+Tokens carry the user snapshot, role and expiry and are validated in-process with HMAC,
+so authenticated requests need no session lookup. Logout is handled by a revocation list.
+"""
+
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Optional
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PREFIX = "st1."
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def is_signed_token(token: str) -> bool:
+    return token.startswith(TOKEN_PREFIX)
+
+
+def sign_session_token(secret: str, user_doc: Dict, ttl: timedelta) -> str:
+    """Mint a token for a users document; expiry is now + ttl"""
+    created_at = user_doc["created_at"]
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+
+    payload = {
+        "sub": user_doc["user_id"],
+        "role": user_doc.get("role", "customer"),
+        "exp": int(time.time() + ttl.total_seconds()),
+        "jti": uuid.uuid4().hex,
+        "email": user_doc["email"],
+        "name": user_doc["name"],
+        "picture": user_doc.get("picture"),
+        "phone": user_doc.get("phone"),
+        "ca": int(created_at.timestamp())
+    }
+    body = _b64encode(json.dumps(payload, separators=(",", ":")).encode())
+    signature = hmac.new(secret.encode(), body.encode(), hashlib.sha256).digest()
+    return f"{TOKEN_PREFIX}{body}.{_b64encode(signature)}"
+
+
+def verify_session_token(secret: str, token: str) -> Optional[Dict]:
+    """Return the payload of a valid, unexpired token, else None"""
+    try:
+        body, signature = token[len(TOKEN_PREFIX):].split(".", 1)
+        expected = hmac.new(secret.encode(), body.encode(), hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _b64decode(signature)):
+            return None
+        payload = json.loads(_b64decode(body))
+    except (ValueError, TypeError):
+        return None
+
+    if payload.get("exp", 0) < time.time():
+        return None
+    return payload
+
+
+def user_doc_from_payload(payload: Dict) -> Dict:
+    return {
+        "user_id": payload["sub"],
+        "email": payload["email"],
+        "name": payload["name"],
+        "picture": payload.get("picture"),
+        "role": payload["role"],
+        "phone": payload.get("phone"),
+        "created_at": datetime.fromtimestamp(payload["ca"], tz=timezone.utc)
+    }
+
+
+class RevocationList:
+    """In-process copy of db.revoked_sessions, kept current by periodic sync"""
+
+    # Re-read a few seconds of history each sync to tolerate clock skew between workers
+    SYNC_OVERLAP = timedelta(seconds=5)
+
+    def __init__(self):
+        self._revoked: Dict[str, float] = {}
+        self._last_sync: Optional[datetime] = None
+
+    def is_revoked(self, jti: str) -> bool:
+        return jti in self._revoked
+
+    def add(self, jti: str, exp: float):
+        self._revoked[jti] = exp
+
+    async def revoke(self, db, payload: Dict):
+        """Record a logout so every worker rejects the token"""
+        now = datetime.now(timezone.utc)
+        await db.revoked_sessions.insert_one({
+            "jti": payload["jti"],
+            "user_id": payload["sub"],
+            "expires_at": datetime.fromtimestamp(payload["exp"], tz=timezone.utc),
+            "revoked_at": now
+        })
+        self.add(payload["jti"], payload["exp"])
+
+    async def sync(self, db):
+        now = datetime.now(timezone.utc)
+        query = {"expires_at": {"$gt": now}}
+        if self._last_sync:
+            query["revoked_at"] = {"$gte": self._last_sync - self.SYNC_OVERLAP}
+
+        async for entry in db.revoked_sessions.find(query, {"_id": 0, "jti": 1, "expires_at": 1}):
+            expires_at = entry["expires_at"]
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            self._revoked[entry["jti"]] = expires_at.timestamp()
+
+        # Expired tokens fail verification anyway, so their revocations can be dropped
+        cutoff = now.timestamp()
+        for jti in [jti for jti, exp in self._revoked.items() if exp < cutoff]:
+            del self._revoked[jti]
+
+        self._last_sync = now
+
+    def __len__(self):
+        return len(self._revoked)
@@ -0,0 +1,85 @@
+"""
+Sparse fieldsets for House of Neelam list endpoints
+`fields=` takes a preset name or a comma-separated list of fields and becomes a MongoDB
+projection, so unused fields (long descriptions, every image, order items) are neither
+decoded from BSON nor serialized.
+"""
+
+from fastapi import HTTPException
+from typing import Dict, Iterable, List, Optional
+
+PRODUCT_FIELDS = {
+    "product_id", "name", "description", "price", "images", "category", "subcategory", "stock",
+    "rating", "reviews_count", "tags", "weight", "material", "created_at", "updated_at"
+}
+ORDER_FIELDS = {
+    "order_id", "user_id", "guest_phone", "guest_email", "items", "total_amount", "status",
+    "payment_status", "session_id", "created_at", "updated_at"
+}
+
+PRODUCT_PRESETS = {
+    # Product grid tiles: one image, no description
+    "card": ["product_id", "name", "price", "images", "category", "stock", "rating", "reviews_count"],
+}
+ORDER_PRESETS = {
+    # Order tables: no items
+    "summary": ["order_id", "user_id", "guest_phone", "guest_email", "total_amount", "status",
+                "payment_status", "created_at"],
+    # Customer order history list: what the page renders, nothing about the buyer or payment session
+    "history": ["order_id", "items", "total_amount", "status", "payment_status", "created_at"],
+}
+
+# Array fields trimmed by a preset ({field: number of elements kept})
+PRESET_SLICES = {
+    "card": {"images": 1},
+}
+
+
+class FieldSet:
+    def __init__(self, fields: List[str], slices: Optional[Dict[str, int]] = None):
+        self.fields = fields
+        self.slices = slices or {}
+
+    def projection(self, *extra: str) -> Dict:
+        projection = {"_id": 0}
+        for field in list(self.fields) + list(extra):
+            projection[field] = {"$slice": self.slices[field]} if field in self.slices else 1
+        return projection
+
+    def select(self, doc: Dict) -> Dict:
+        """Apply the field set to an in-memory document (catalog snapshot rows)"""
+        selected = {}
+        for field in self.fields:
+            if field in doc:
+                value = doc[field]
+                if field in self.slices and isinstance(value, list):
+                    value = value[:self.slices[field]]
+                selected[field] = value
+        return selected
+
+    def select_all(self, docs: Iterable[Dict]) -> List[Dict]:
+        return [self.select(doc) for doc in docs]
+
+
+def parse_fields(fields: Optional[str], allowed: set, presets: Dict[str, List[str]], key: str) -> Optional[FieldSet]:
+    """None when no `fields` parameter was given; 400 on unknown fields"""
+    if not fields:
+        return None
+    if fields in presets:
+        return FieldSet(presets[fields], PRESET_SLICES.get(fields))
+
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    if key not in requested:
+        requested.insert(0, key)
+    return FieldSet(list(dict.fromkeys(requested)))
+
+
+def product_fields(fields: Optional[str]) -> Optional[FieldSet]:
+    return parse_fields(fields, PRODUCT_FIELDS, PRODUCT_PRESETS, "product_id")
+
+
+def order_fields(fields: Optional[str]) -> Optional[FieldSet]:
+    return parse_fields(fields, ORDER_FIELDS, ORDER_PRESETS, "order_id")
@@ -0,0 +1,135 @@
+"""
+Typeahead prefix index for House of Neelam
+A sorted array of lowercase keys searched with bisect: more compact than a trie in Python and
+just as fast for prefix lookups. Product names are indexed from every word, so "sapph" finds
+"Royal Sapphire Ring". Kept current by catalog snapshot listeners.
+"""
+
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+import re
+
+# Lower rank = shown first
+KIND_RANKS = {"category": 0, "subcategory": 1, "product": 2, "tag": 3}
+KINDS = {rank: kind for kind, rank in KIND_RANKS.items()}
+
+_WORD = re.compile(r"\w+")
+
+# (key, kind rank, display text, product_id or "")
+Entry = Tuple[str, int, str, str]
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+class SuggestIndex:
+    def __init__(self, scan_factor: int = 20):
+        self.scan_factor = scan_factor
+        self._entries: List[Entry] = []
+        # Inserts are buffered so a full catalog load costs one sort instead of n insorts
+        self._pending: List[Entry] = []
+        self._product_entries: Dict[str, List[Entry]] = {}
+        self._product_terms: Dict[str, List[Tuple[int, str]]] = {}
+        # Category / subcategory / tag entries are shared between products
+        self._term_counts: Dict[Tuple[int, str], int] = {}
+
+    def __len__(self):
+        return len(self._entries) + len(self._pending)
+
+    # ---------- maintenance ----------
+
+    def _flush(self):
+        if len(self._pending) < 64:
+            for entry in self._pending:
+                insort(self._entries, entry)
+        else:
+            self._entries.extend(self._pending)
+            self._entries.sort()
+        self._pending = []
+
+    def _insert(self, entry: Entry):
+        self._pending.append(entry)
+
+    def _delete(self, entry: Entry):
+        if self._pending:
+            self._flush()
+        i = bisect_left(self._entries, entry)
+        if i < len(self._entries) and self._entries[i] == entry:
+            del self._entries[i]
+
+    @staticmethod
+    def _term_entry(rank: int, display: str) -> Entry:
+        return (" ".join(_words(display)), rank, display, "")
+
+    def add(self, product_id: str, doc: Dict):
+        self.remove(product_id)
+
+        name = doc.get("name") or ""
+        words = _words(name)
+        entries = sorted({(" ".join(words[i:]), KIND_RANKS["product"], name, product_id) for i in range(len(words))})
+        for entry in entries:
+            self._insert(entry)
+        self._product_entries[product_id] = entries
+
+        terms = []
+        for field, kind in (("category", "category"), ("subcategory", "subcategory")):
+            if doc.get(field):
+                terms.append((KIND_RANKS[kind], str(doc[field])))
+        terms.extend((KIND_RANKS["tag"], str(tag)) for tag in set(doc.get("tags") or []) if tag)
+        for term in terms:
+            self._term_counts[term] = self._term_counts.get(term, 0) + 1
+            if self._term_counts[term] == 1:
+                self._insert(self._term_entry(*term))
+        self._product_terms[product_id] = terms
+
+    def remove(self, product_id: str):
+        for entry in self._product_entries.pop(product_id, ()):
+            self._delete(entry)
+        for term in self._product_terms.pop(product_id, ()):
+            self._term_counts[term] -= 1
+            if not self._term_counts[term]:
+                del self._term_counts[term]
+                self._delete(self._term_entry(*term))
+
+    def on_catalog_change(self, product_id: str, doc: Optional[Dict]):
+        """Catalog snapshot listener"""
+        if doc is None:
+            self.remove(product_id)
+        else:
+            self.add(product_id, doc)
+
+    # ---------- queries ----------
+
+    def suggest(self, prefix: str, limit: int = 8) -> List[Dict]:
+        key = " ".join(_words(prefix))
+        if not key:
+            return []
+        if self._pending:
+            self._flush()
+
+        matches = []
+        seen = set()
+        i = bisect_left(self._entries, (key,))
+        end = min(len(self._entries), i + limit * self.scan_factor)
+        while i < end and self._entries[i][0].startswith(key):
+            _, rank, display, product_id = self._entries[i]
+            i += 1
+            if (rank, display) in seen:
+                continue
+            seen.add((rank, display))
+            # Prefer kind, then matches at the start of the text, then shorter text
+            starts = display.lower().startswith(key)
+            matches.append(((rank, not starts, len(display)), rank, display, product_id))
+
+        matches.sort(key=lambda m: m[0])
+        return [
+            {"text": display, "type": KINDS[rank], "product_id": product_id or None}
+            for _, rank, display, product_id in matches[:limit]
+        ]
+
+    def stats(self) -> Dict:
+        return {"entries": len(self), "products": len(self._product_entries), "terms": len(self._term_counts)}
+
+
+suggest_index = SuggestIndex()
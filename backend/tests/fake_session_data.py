@@ -0,0 +1,41 @@
+"""
+Local stand-in for the Emergent OAuth session-data endpoint
+
+Run it next to the backend and point the server at it:
+    uvicorn tests.fake_session_data:app --port 8011
+    EMERGENT_SESSION_DATA_URL=http://localhost:8011/auth/v1/env/oauth/session-data
+
+Session ids:
+    fail_*   -> 500 (trips the circuit breaker)
+    slow_*   -> answers after FAKE_SESSION_DELAY seconds (exercises read timeouts)
+    invalid* -> 401
+    anything else -> 200 with a user derived from the id
+"""
+
+import asyncio
+import os
+
+from fastapi import FastAPI, Header
+from fastapi.responses import JSONResponse
+
+app = FastAPI()
+
+FAKE_SESSION_DELAY = float(os.environ.get('FAKE_SESSION_DELAY', '10'))
+
+
+@app.get("/auth/v1/env/oauth/session-data")
+async def session_data(x_session_id: str = Header(...)):
+    if x_session_id.startswith("fail_"):
+        return JSONResponse(status_code=500, content={"detail": "upstream error"})
+    if x_session_id.startswith("slow_"):
+        await asyncio.sleep(FAKE_SESSION_DELAY)
+    if x_session_id.startswith("invalid"):
+        return JSONResponse(status_code=401, content={"detail": "Invalid session"})
+
+    return {
+        "id": x_session_id,
+        "email": f"{x_session_id}@example.com",
+        "name": f"Test {x_session_id}",
+        "picture": f"https://example.com/{x_session_id}.png",
+        "session_token": f"fake_session_{x_session_id}"
+    }
@@ -0,0 +1,33 @@
+"""
+Tests for client-address resolution behind the reverse proxy
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth_workers import TrustedProxies
+
+
+class TestTrustedProxies:
+    """X-Real-IP is only believed when the peer is a trusted proxy"""
+
+    proxies = TrustedProxies(["127.0.0.1", "::1", "172.28.0.0/16"])
+
+    def test_trusted_proxy_passes_real_ip(self):
+        assert self.proxies.client_ip("172.28.0.10", "203.0.113.7") == "203.0.113.7"
+        assert self.proxies.client_ip("::1", " 203.0.113.7 ") == "203.0.113.7"
+
+    def test_untrusted_peer_cannot_forge_real_ip(self):
+        assert self.proxies.client_ip("198.51.100.23", "203.0.113.7") == "198.51.100.23"
+        assert self.proxies.client_ip("2001:db8::5", "127.0.0.1") == "2001:db8::5"
+
+    def test_peer_without_header(self):
+        assert self.proxies.client_ip("172.28.0.10", None) == "172.28.0.10"
+
+    def test_unknown_or_unparseable_peer(self):
+        assert self.proxies.client_ip(None, "203.0.113.7") == "unknown"
+        assert self.proxies.client_ip("testclient", "203.0.113.7") == "testclient"
+
+    def test_no_trusted_proxies(self):
+        assert TrustedProxies(["", " "]).client_ip("127.0.0.1", "203.0.113.7") == "127.0.0.1"
@@ -0,0 +1,350 @@
+"""
+Tests for stock reservations, run against an in-memory MongoDB (mongomock_motor)
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from starlette.requests import Request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import inventory
+from catalog_cache import CatalogSnapshot
+from http_cache import catalog_etag
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    """Each test gets its own snapshot and flash-sale counters instead of the module singletons"""
+    monkeypatch.setattr(inventory, "catalog", CatalogSnapshot())
+    monkeypatch.setattr(inventory, "flash_sale", inventory.FlashSaleStock([]))
+
+
+def make_db(**stock):
+    db = AsyncMongoMockClient()["test_inventory"]
+
+    async def seed():
+        await db.products.insert_many([
+            {"product_id": product_id, "name": product_id.title(), "price": 100.0, "category": "Rings", "stock": count}
+            for product_id, count in stock.items()
+        ])
+    asyncio.run(seed())
+    return db
+
+
+def lines(**quantities):
+    return [{"product_id": product_id, "quantity": quantity} for product_id, quantity in quantities.items()]
+
+
+async def product(db, product_id):
+    return await db.products.find_one({"product_id": product_id}, {"_id": 0})
+
+
+def later():
+    """A sweep time safely past holds reserved with ttl=0 (stored datetimes keep milliseconds only)"""
+    return datetime.now(timezone.utc) + timedelta(seconds=1)
+
+
+def listing_etag(version):
+    request = Request({"type": "http", "method": "GET", "path": "/api/products", "query_string": b"", "headers": []})
+    return catalog_etag(request, version)
+
+
+class TestCatalogVersion:
+    """Stock changes must revalidate ETags and refresh the snapshot, without a write per checkout"""
+
+    def test_stock_changes_are_published_in_one_bump(self):
+        db = make_db(necklace=2)
+
+        async def run():
+            await inventory.catalog.load(db)
+            before = inventory.catalog.version
+            await inventory.reserve(db, "o1", lines(necklace=1))
+            await inventory.reserve(db, "o2", lines(necklace=1))
+            unpublished = (inventory.catalog.version, await db.catalog_meta.count_documents({}))
+            await inventory.catalog.publish_stock_changes(db)
+            sold_out = (inventory.catalog.version, inventory.catalog.get("necklace")["stock"])
+            await inventory.release(db, "o1")
+            await inventory.catalog.publish_stock_changes(db)
+            restocked = (inventory.catalog.version, inventory.catalog.get("necklace")["stock"])
+            await inventory.catalog.publish_stock_changes(db)
+            return before, unpublished, sold_out, restocked, inventory.catalog.version
+
+        before, unpublished, sold_out, restocked, idle = asyncio.run(run())
+        # Checkouts only record the change; nothing is written to catalog_meta inline
+        assert unpublished == (before, 0)
+        assert sold_out == (before + 1, 0)
+        assert listing_etag(sold_out[0]) != listing_etag(before)
+        assert restocked == (before + 2, 1)
+        assert idle == restocked[0]
+
+    def test_rejected_reserve_publishes_nothing(self):
+        db = make_db(necklace=0)
+
+        async def run():
+            await inventory.catalog.load(db)
+            before = inventory.catalog.version
+            with pytest.raises(inventory.InsufficientStock):
+                await inventory.reserve(db, "o1", lines(necklace=1))
+            await inventory.catalog.publish_stock_changes(db)
+            return before, inventory.catalog.version
+
+        before, after = asyncio.run(run())
+        assert before == after
+
+    def test_stock_only_changes_skip_listeners(self):
+        db = make_db(necklace=2)
+        changes = []
+
+        async def run():
+            await inventory.catalog.load(db)
+            inventory.catalog.add_listener(lambda product_id, doc: changes.append(product_id))
+            await inventory.reserve(db, "o1", lines(necklace=1))
+            await inventory.catalog.publish_stock_changes(db)
+            await db.products.update_one({"product_id": "necklace"}, {"$set": {"name": "Renamed"}})
+            await inventory.catalog.load(db)
+
+        asyncio.run(run())
+        assert changes == ["necklace"]
+
+
+class TestReservations:
+    """Take, release, commit and the expiry sweeper"""
+
+    def test_take_is_all_or_nothing(self):
+        db = make_db(ring=2, bangle=0)
+
+        async def run():
+            with pytest.raises(inventory.InsufficientStock) as error:
+                await inventory.reserve(db, "o1", lines(ring=1, bangle=1, anklet=1))
+            reservation = await db.stock_reservations.find_one({"order_id": "o1"})
+            return error.value, await product(db, "ring"), reservation
+
+        error, ring, reservation = asyncio.run(run())
+        assert error.unavailable == ["bangle"]
+        assert error.missing == ["anklet"]
+        # The ring line landed first and was rolled back
+        assert ring["stock"] == 2
+        assert not ring.get("stock_holds")
+        assert reservation["status"] == "released"
+
+    def test_release_is_idempotent(self):
+        db = make_db(ring=2)
+
+        async def run():
+            await inventory.reserve(db, "o1", lines(ring=2))
+            first = await inventory.release(db, "o1")
+            second = await inventory.release(db, "o1")
+            return first, second, await product(db, "ring")
+
+        first, second, ring = asyncio.run(run())
+        assert (first, second) == (True, False)
+        assert ring["stock"] == 2
+        assert not ring.get("stock_holds")
+
+    def test_commit_is_idempotent(self):
+        db = make_db(ring=2)
+
+        async def run():
+            await inventory.reserve(db, "o1", lines(ring=1))
+            results = [await inventory.commit(db, "o1"), await inventory.commit(db, "o1")]
+            released = await inventory.release(db, "o1")
+            return results, released, await product(db, "ring")
+
+        results, released, ring = asyncio.run(run())
+        assert results == [True, True]
+        # A committed hold cannot be given back
+        assert released is False
+        assert ring["stock"] == 1
+        assert not ring.get("stock_holds")
+
+    def test_expired_hold_is_released_and_order_cancelled(self):
+        db = make_db(ring=1)
+
+        async def run():
+            await db.orders.insert_one({"order_id": "o1", "status": "pending", "payment_status": "pending"})
+            await inventory.reserve(db, "o1", lines(ring=1), ttl=0)
+            released = await inventory.release_expired(db, later())
+            order = await db.orders.find_one({"order_id": "o1"})
+            return released, order, await product(db, "ring")
+
+        released, order, ring = asyncio.run(run())
+        assert released == 1
+        assert (order["status"], order["payment_status"]) == ("cancelled", "expired")
+        assert ring["stock"] == 1
+
+    def test_commit_after_expiry_retakes_stock(self):
+        db = make_db(ring=1)
+
+        async def run():
+            await inventory.reserve(db, "o1", lines(ring=1), ttl=0)
+            await inventory.release_expired(db, later())
+            committed = await inventory.commit(db, "o1")
+            return committed, await product(db, "ring")
+
+        committed, ring = asyncio.run(run())
+        assert committed is True
+        assert ring["stock"] == 0
+        assert not ring.get("stock_holds")
+
+    def test_commit_after_expiry_fails_when_stock_is_gone(self):
+        db = make_db(ring=1)
+
+        async def run():
+            await inventory.reserve(db, "o1", lines(ring=1), ttl=0)
+            await inventory.release_expired(db, later())
+            await inventory.reserve(db, "o2", lines(ring=1))
+            committed = await inventory.commit(db, "o1")
+            reservation = await db.stock_reservations.find_one({"order_id": "o1"})
+            return committed, reservation, await product(db, "ring")
+
+        committed, reservation, ring = asyncio.run(run())
+        assert committed is False
+        assert reservation["status"] == "released"
+        assert ring["stock"] == 0
+        assert list(ring["stock_holds"]) == ["o2"]
+
+    def test_payment_during_sweeper_release_retakes_stock(self):
+        db = make_db(ring=1)
+
+        async def run():
+            await inventory.reserve(db, "o1", lines(ring=1), ttl=0)
+            # A sweeper claimed the hold, then the payment was confirmed before it released it
+            await db.stock_reservations.update_one({"order_id": "o1"}, {"$set": {"status": "releasing"}})
+            await db.orders.insert_one({"order_id": "o1", "status": "confirmed", "payment_status": "paid"})
+            committed = await inventory.commit(db, "o1")
+            await inventory.release_expired(db, later() + timedelta(seconds=inventory.STALE_RELEASE_SECONDS))
+            reservation = await db.stock_reservations.find_one({"order_id": "o1"})
+            order = await db.orders.find_one({"order_id": "o1"})
+            return committed, reservation, order, await product(db, "ring")
+
+        committed, reservation, order, ring = asyncio.run(run())
+        assert committed is True
+        assert reservation["status"] == "committed"
+        assert (order["status"], order["payment_status"]) == ("confirmed", "paid")
+        assert "fulfillment_issue" not in order
+        assert ring["stock"] == 0
+
+    def test_payment_during_sweeper_release_flags_lost_stock(self, monkeypatch):
+        db = make_db(ring=1)
+        release = inventory.release
+
+        async def release_then_sell(db, order_id, reservation=None):
+            released = await release(db, order_id, reservation)
+            # The released unit sells before the sweeper gets to re-take it
+            await inventory.reserve(db, "o2", lines(ring=1))
+            return released
+
+        monkeypatch.setattr(inventory, "release", release_then_sell)
+
+        async def run():
+            await inventory.reserve(db, "o1", lines(ring=1), ttl=0)
+            await db.stock_reservations.update_one({"order_id": "o1"}, {"$set": {"status": "releasing"}})
+            await db.orders.insert_one({"order_id": "o1", "status": "confirmed", "payment_status": "paid"})
+            await inventory.commit(db, "o1")
+            await inventory.release_expired(db, later() + timedelta(seconds=inventory.STALE_RELEASE_SECONDS))
+            return await db.orders.find_one({"order_id": "o1"})
+
+        order = asyncio.run(run())
+        assert order["payment_status"] == "paid"
+        assert order["fulfillment_issue"] == "insufficient_stock"
+
+    def test_concurrent_reserves_do_not_oversell(self):
+        db = make_db(ring=3)
+
+        async def attempt(order_id):
+            try:
+                await inventory.reserve(db, order_id, lines(ring=1))
+                return True
+            except inventory.InsufficientStock:
+                return False
+
+        async def run():
+            results = await asyncio.gather(*(attempt(f"o{i}") for i in range(50)))
+            return results, await product(db, "ring")
+
+        results, ring = asyncio.run(run())
+        assert sum(results) == 3
+        assert ring["stock"] == 0
+        assert len(ring["stock_holds"]) == 3
+
+
+class TestFlashSale:
+    """In-memory counters and their batched flush"""
+
+    def test_flush_writes_one_hold_per_order(self):
+        db = make_db(necklace=3)
+
+        async def run():
+            await inventory.flash_sale.load(db, ["necklace"])
+            for i in range(3):
+                await inventory.reserve(db, f"o{i}", lines(necklace=1))
+            with pytest.raises(inventory.InsufficientStock):
+                await inventory.reserve(db, "o3", lines(necklace=1))
+            unflushed = await product(db, "necklace")
+            await inventory.flash_sale.flush(db)
+            return unflushed, await product(db, "necklace")
+
+        unflushed, flushed = asyncio.run(run())
+        assert unflushed["stock"] == 3
+        assert flushed["stock"] == 0
+        assert sorted(flushed["stock_holds"]) == ["o0", "o1", "o2"]
+
+    def test_short_flush_releases_reservations_it_cannot_cover(self):
+        db = make_db(necklace=3, ring=5)
+
+        async def run():
+            await inventory.flash_sale.load(db, ["necklace"])
+            for i in range(3):
+                await db.orders.insert_one({"order_id": f"o{i}", "status": "pending", "payment_status": "pending"})
+                await inventory.reserve(db, f"o{i}", lines(necklace=1, ring=1))
+            # Stock shrinks underneath the counters before the holds are written
+            await db.products.update_one({"product_id": "necklace"}, {"$set": {"stock": 1}})
+            await inventory.flash_sale.flush(db)
+
+            reservations = {r["order_id"]: r["status"] async for r in db.stock_reservations.find()}
+            orders = {o["order_id"]: o["status"] async for o in db.orders.find()}
+            committed = {order_id: await inventory.commit(db, order_id) for order_id in ("o0", "o1", "o2")}
+            return (reservations, orders, committed, await product(db, "necklace"),
+                    await product(db, "ring"), inventory.flash_sale.stats())
+
+        reservations, orders, committed, necklace, ring, stats = asyncio.run(run())
+        assert reservations == {"o0": "held", "o1": "released", "o2": "released"}
+        assert orders == {"o0": "pending", "o1": "cancelled", "o2": "cancelled"}
+        # Paying a dropped order cannot take stock that is not there
+        assert committed == {"o0": True, "o1": False, "o2": False}
+        assert necklace["stock"] == 0
+        # The dropped orders' other lines were given back
+        assert ring["stock"] == 4
+        assert stats["short"] == 2
+        assert stats["available"] == {"necklace": 0}
+
+    def test_commit_flushes_before_claiming(self):
+        db = make_db(necklace=2)
+
+        async def run():
+            await inventory.flash_sale.load(db, ["necklace"])
+            await inventory.reserve(db, "o0", lines(necklace=1))
+            await inventory.reserve(db, "o1", lines(necklace=1))
+            await db.products.update_one({"product_id": "necklace"}, {"$set": {"stock": 1}})
+            # No explicit flush: commit must find out that o1 was never covered
+            return await inventory.commit(db, "o0"), await inventory.commit(db, "o1")
+
+        assert asyncio.run(run()) == (True, False)
+
+    def test_reload_keeps_pending_holds(self):
+        db = make_db(necklace=3)
+
+        async def run():
+            await inventory.flash_sale.load(db, ["necklace"])
+            await inventory.reserve(db, "o0", lines(necklace=1))
+            await inventory.flash_sale.load(db)
+            return await product(db, "necklace"), inventory.flash_sale.stats()
+
+        necklace, stats = asyncio.run(run())
+        assert necklace["stock_holds"] == {"o0": 1}
+        assert stats["available"] == {"necklace": 2}
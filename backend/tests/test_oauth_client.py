@@ -0,0 +1,86 @@
+"""
+Tests for the pooled session-data client, run against the local fake endpoint
+"""
+import asyncio
+import os
+import sys
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from oauth_client import CircuitBreaker, SessionDataClient, SessionServiceUnavailable
+from fake_session_data import app as fake_app
+
+FAKE_URL = "http://fake-auth/auth/v1/env/oauth/session-data"
+
+
+def make_client(**kwargs):
+    return SessionDataClient(FAKE_URL, transport=httpx.ASGITransport(app=fake_app), **kwargs)
+
+
+async def fetch_all(client, session_ids):
+    await client.start()
+    try:
+        results = []
+        for session_id in session_ids:
+            try:
+                results.append(await client.fetch(session_id))
+            except SessionServiceUnavailable:
+                results.append("unavailable")
+        return results
+    finally:
+        await client.close()
+
+
+class TestSessionDataClient:
+    """Session exchange, rejection and circuit breaking"""
+
+    def test_valid_session(self):
+        [data] = asyncio.run(fetch_all(make_client(), ["abc123"]))
+        assert data["email"] == "abc123@example.com"
+        assert data["session_token"] == "fake_session_abc123"
+
+    def test_invalid_session_returns_none(self):
+        [data] = asyncio.run(fetch_all(make_client(), ["invalid_1"]))
+        assert data is None
+
+    def test_breaker_opens_after_failures(self):
+        client = make_client(breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+        results = asyncio.run(fetch_all(client, ["fail_1", "fail_2", "abc123"]))
+        assert results == ["unavailable", "unavailable", "unavailable"]
+        assert client.breaker.state == "open"
+
+    def test_breaker_half_open_probe_closes_circuit(self):
+        client = make_client(breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0))
+        results = asyncio.run(fetch_all(client, ["fail_1", "abc123"]))
+        assert results[0] == "unavailable"
+        assert results[1]["email"] == "abc123@example.com"
+        assert client.breaker.state == "closed"
+
+    def test_fetch_requires_start(self):
+        with pytest.raises(RuntimeError):
+            asyncio.run(make_client().fetch("abc123"))
+
+    def test_cancelled_probe_does_not_wedge_breaker(self):
+        class HangingTransport(httpx.AsyncBaseTransport):
+            async def handle_async_request(self, request):
+                await asyncio.sleep(60)
+
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        client = SessionDataClient(FAKE_URL, transport=HangingTransport(), breaker=breaker)
+
+        async def cancelled_probe():
+            await client.start()
+            try:
+                with pytest.raises(asyncio.TimeoutError):
+                    await asyncio.wait_for(client.fetch("abc123"), 0.01)
+            finally:
+                await client.close()
+
+        asyncio.run(cancelled_probe())
+        assert breaker.failures == 2
+        # The probe slot was given back, so the next request may probe again
+        assert breaker.allow()
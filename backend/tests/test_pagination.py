@@ -0,0 +1,60 @@
+"""
+Tests for keyset pagination over mixed-type sort fields, run against an in-memory MongoDB
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+from mongomock_motor import AsyncMongoMockClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pagination import decode_cursor, encode_cursor, keyset_filter
+
+
+async def walk(collection, page_size):
+    """Page through orders newest first the way GET /api/orders does"""
+    seen, cursor = [], None
+    while True:
+        query = {}
+        if cursor:
+            last_value, last_id = decode_cursor(cursor, "newest")
+            query = keyset_filter("created_at", -1, last_value, last_id, tiebreak="order_id")
+        page = await collection.find(query).sort([("created_at", -1), ("order_id", -1)]).limit(page_size).to_list(page_size)
+        seen += [doc["order_id"] for doc in page]
+        if len(page) < page_size:
+            return seen
+        cursor = encode_cursor("newest", page[-1], "created_at", tiebreak="order_id")
+
+
+class TestKeysetFilter:
+    """Pages must not skip rows whose sort value has another BSON type"""
+
+    def test_unmigrated_string_dates_follow_date_rows(self):
+        collection = AsyncMongoMockClient()["test_pagination"]["orders"]
+        start = datetime(2025, 1, 1)
+        docs = [{"order_id": f"date_{i}", "created_at": start + timedelta(days=i)} for i in range(5)]
+        # Legacy rows written before datetimes were normalized
+        docs += [{"order_id": f"text_{i}", "created_at": (start - timedelta(days=i + 1)).isoformat()} for i in range(5)]
+        docs.append({"order_id": "undated"})
+
+        async def run():
+            await collection.insert_many(docs)
+            return await walk(collection, page_size=3)
+
+        seen = asyncio.run(run())
+        assert seen == [f"date_{i}" for i in range(4, -1, -1)] + [f"text_{i}" for i in range(5)] + ["undated"]
+
+    def test_ascending_includes_later_types(self):
+        collection = AsyncMongoMockClient()["test_pagination"]["products"]
+
+        async def run():
+            await collection.insert_many([
+                {"product_id": "a", "price": 5},
+                {"product_id": "b", "price": "7"},
+                {"product_id": "c", "price": datetime(2025, 1, 1)}
+            ])
+            return await collection.find(keyset_filter("price", 1, 5, "a")).to_list(None)
+
+        assert [doc["product_id"] for doc in asyncio.run(run())] == ["b", "c"]
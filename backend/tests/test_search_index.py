@@ -0,0 +1,60 @@
+"""
+Tests for the in-process search index result cache
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import SearchIndex
+
+PRODUCTS = {
+    "p1": {"name": "Royal Sapphire Ring", "category": "Rings", "tags": ["sapphire", "gold"]},
+    "p2": {"name": "Vintage Pearl Necklace", "category": "Necklaces", "tags": ["pearl", "silver"]},
+}
+
+
+def make_index(**kwargs):
+    index = SearchIndex(**kwargs)
+    for product_id, doc in PRODUCTS.items():
+        index.add(product_id, doc)
+    return index
+
+
+class TestResultCache:
+    """Repeated queries are served from the cache until the index changes"""
+
+    def test_normalized_repeat_is_a_hit(self):
+        index = make_index()
+        first = index.search("sapphire rings")
+        assert index.search("  Sapphire RING ") == first
+        assert (index.cache_hits, index.cache_misses) == (1, 1)
+
+    def test_limit_and_fuzzy_are_part_of_the_key(self):
+        index = make_index()
+        index.search("pearl", limit=1)
+        index.search("pearl", limit=20)
+        index.search("pearl", fuzzy=False)
+        assert index.cache_misses == 3
+
+    def test_product_writes_invalidate(self):
+        index = make_index()
+        assert [pid for pid, _ in index.search("emerald")] == []
+        index.add("p3", {"name": "Emerald Pendant", "tags": ["emerald"]})
+        assert [pid for pid, _ in index.search("emerald")] == ["p3"]
+        index.on_catalog_change("p3", None)
+        assert index.search("emerald") == []
+
+    def test_cache_is_bounded(self):
+        index = make_index(cache_size=2)
+        for query in ("ring", "pearl", "gold"):
+            index.search(query)
+        assert index.stats()["result_cache"]["entries"] == 2
+        index.search("ring")
+        assert index.cache_misses == 4
+
+    def test_disabled_cache(self):
+        index = make_index(cache_size=0)
+        index.search("ring")
+        index.search("ring")
+        assert (index.cache_hits, index.cache_misses) == (0, 2)
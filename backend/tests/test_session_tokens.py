@@ -0,0 +1,123 @@
+"""
+Tests for stateless signed session tokens and the revocation list, run against an in-memory
+MongoDB (mongomock_motor)
+"""
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import auth
+from session_tokens import (
+    TOKEN_PREFIX, RevocationList, _b64decode, _b64encode, sign_session_token, verify_session_token
+)
+
+SECRET = "test-signing-secret"
+USER = {
+    "user_id": "user_1",
+    "email": "asha@example.com",
+    "name": "Asha",
+    "role": "customer",
+    "created_at": datetime(2024, 1, 1, tzinfo=timezone.utc)
+}
+
+
+def mint(ttl=timedelta(hours=1), secret=SECRET):
+    return sign_session_token(secret, USER, ttl)
+
+
+def tampered(token, **changes):
+    """The original signature over an edited payload"""
+    body, signature = token[len(TOKEN_PREFIX):].split(".", 1)
+    payload = {**json.loads(_b64decode(body)), **changes}
+    return f"{TOKEN_PREFIX}{_b64encode(json.dumps(payload).encode())}.{signature}"
+
+
+@pytest.fixture
+def signed_mode(monkeypatch):
+    """auth resolves signed tokens with SECRET against a fresh revocation list"""
+    revocations = RevocationList()
+    monkeypatch.setattr(auth, "SESSION_SIGNING_SECRET", SECRET)
+    monkeypatch.setattr(auth, "revocation_list", revocations)
+    return revocations
+
+
+def current_user(token):
+    return asyncio.run(auth.get_current_user(authorization=f"Bearer {token}", session_token=None))
+
+
+class TestSignedTokens:
+    """HMAC verification and expiry"""
+
+    def test_valid_token(self):
+        payload = verify_session_token(SECRET, mint())
+        assert payload["sub"] == "user_1"
+        assert payload["role"] == "customer"
+
+    def test_tampered_payload_is_rejected(self):
+        assert verify_session_token(SECRET, tampered(mint(), role="admin")) is None
+
+    def test_tampered_signature_is_rejected(self):
+        body, signature = mint().rsplit(".", 1)
+        # The first character is all signature bits (the last one carries base64 padding)
+        flipped = ("B" if signature[0] == "A" else "A") + signature[1:]
+        assert verify_session_token(SECRET, f"{body}.{flipped}") is None
+
+    def test_other_secret_is_rejected(self):
+        assert verify_session_token(SECRET, mint(secret="another-secret")) is None
+
+    def test_malformed_token_is_rejected(self):
+        assert verify_session_token(SECRET, TOKEN_PREFIX + "no-signature") is None
+        assert verify_session_token(SECRET, TOKEN_PREFIX + "!!!.???") is None
+
+    def test_expired_token_is_rejected(self):
+        assert verify_session_token(SECRET, mint(ttl=timedelta(seconds=-1))) is None
+
+    def test_auth_resolves_valid_token(self, signed_mode):
+        user = current_user(mint())
+        assert user.user_id == "user_1"
+        assert user.email == "asha@example.com"
+
+    def test_auth_rejects_tampered_and_expired_tokens(self, signed_mode):
+        assert current_user(tampered(mint(), role="admin")) is None
+        assert current_user(mint(ttl=timedelta(seconds=-1))) is None
+
+    def test_auth_rejects_revoked_token(self, signed_mode):
+        token = mint()
+        payload = verify_session_token(SECRET, token)
+        signed_mode.add(payload["jti"], payload["exp"])
+        assert current_user(token) is None
+
+
+class TestRevocationList:
+    """A logout on one worker reaches the others through sync"""
+
+    def test_revoke_then_sync_on_another_worker(self):
+        db = AsyncMongoMockClient()["test_session_tokens"]
+        payload = verify_session_token(SECRET, mint())
+        here, there = RevocationList(), RevocationList()
+
+        async def scenario():
+            await there.sync(db)
+            await here.revoke(db, payload)
+            assert here.is_revoked(payload["jti"])
+            assert not there.is_revoked(payload["jti"])
+            await there.sync(db)
+        asyncio.run(scenario())
+
+        assert there.is_revoked(payload["jti"])
+        assert len(there) == 1
+
+    def test_sync_drops_expired_revocations(self):
+        db = AsyncMongoMockClient()["test_session_tokens"]
+        revocations = RevocationList()
+        revocations.add("old_jti", (datetime.now(timezone.utc) - timedelta(minutes=1)).timestamp())
+        asyncio.run(revocations.sync(db))
+        assert not revocations.is_revoked("old_jti")
+        assert len(revocations) == 0
@@ -137,7 +137,11 @@ const Checkout = () => {
       razorpay.open();
     } catch (error) {
       console.error('Checkout error:', error);
-      toast.error('Failed to process checkout. Please try again.');
+      if (error.response?.status === 409) {
+        toast.error(error.response.data.detail);
+      } else {
+        toast.error('Failed to process checkout. Please try again.');
+      }
       setLoading(false);
     }
   };
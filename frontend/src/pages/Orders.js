@@ -12,6 +12,8 @@ const Orders = () => {
   const { user, loading: authLoading } = useAuth();
   const [orders, setOrders] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     if (!authLoading && !user) {
@@ -30,6 +32,7 @@ const Orders = () => {
         withCredentials: true,
       });
       setOrders(response.data);
+      setNextCursor(response.headers['x-next-cursor'] || null);
     } catch (error) {
       console.error('Error fetching orders:', error);
     } finally {
@@ -37,6 +40,22 @@ const Orders = () => {
     }
   };
 
+  const loadMoreOrders = async () => {
+    try {
+      setLoadingMore(true);
+      const response = await axios.get(`${API}/orders`, {
+        params: { cursor: nextCursor },
+        withCredentials: true,
+      });
+      setOrders((current) => [...current, ...response.data]);
+      setNextCursor(response.headers['x-next-cursor'] || null);
+    } catch (error) {
+      console.error('Error fetching orders:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const getStatusColor = (status) => {
     switch (status) {
       case 'confirmed':
@@ -128,6 +147,18 @@ const Orders = () => {
                 </div>
               </div>
             ))}
+            {nextCursor && (
+              <div className="text-center">
+                <button
+                  onClick={loadMoreOrders}
+                  disabled={loadingMore}
+                  className="border border-gold-metallic text-gold-metallic px-8 py-3 font-medium hover:bg-gold-metallic hover:text-white transition-all disabled:opacity-50"
+                  data-testid="load-more-orders"
+                >
+                  {loadingMore ? 'Loading...' : 'Load More Orders'}
+                </button>
+              </div>
+            )}
           </div>
         )}
       </div>
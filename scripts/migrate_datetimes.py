@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Datetime Normalization Migration for House of Neelam E-Commerce
+Rewrites legacy ISO-string timestamps to native BSON dates in bulk batches,
+then records the schema marker that lets the API skip per-row parsing
+"""
+
+import os
+import sys
+from datetime import datetime, timezone
+from pymongo import MongoClient, UpdateOne
+
+BATCH_SIZE = 1000
+
+# Must match schema_version.DATETIME_MARKER / DATETIME_SCHEMA_VERSION in the backend
+SCHEMA_MARKER = {'_id': 'datetimes'}
+SCHEMA_VERSION = 1
+
+# Timestamp fields per collection (dotted paths for embedded documents)
+DATETIME_FIELDS = {
+    'products': ['created_at', 'updated_at'],
+    'orders': ['created_at', 'updated_at'],
+    'categories': ['created_at', 'updated_at'],
+    'reviews': ['created_at'],
+    'wishlist': ['added_at'],
+    'users': ['created_at'],
+    'user_sessions': ['created_at', 'expires_at', 'user.created_at'],
+    'payment_transactions': ['created_at', 'updated_at'],
+}
+
+def parse_timestamp(value):
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+def get_path(doc, path):
+    for part in path.split('.'):
+        if not isinstance(doc, dict):
+            return None
+        doc = doc.get(part)
+    return doc
+
+def migrate_collection(collection, fields, dry_run=False):
+    query = {'$or': [{field: {'$type': 'string'}} for field in fields]}
+    projection = {field: 1 for field in fields}
+
+    converted = 0
+    failed = 0
+    batch = []
+    for doc in collection.find(query, projection):
+        updates = {}
+        for field in fields:
+            value = get_path(doc, field)
+            if isinstance(value, str):
+                try:
+                    updates[field] = parse_timestamp(value)
+                except ValueError:
+                    failed += 1
+                    print(f"  ⚠️  {collection.name} {doc['_id']}: unparseable {field}={value!r}")
+        if updates:
+            batch.append(UpdateOne({'_id': doc['_id']}, {'$set': updates}))
+
+        if len(batch) >= BATCH_SIZE:
+            if not dry_run:
+                collection.bulk_write(batch, ordered=False)
+            converted += len(batch)
+            batch = []
+
+    if batch:
+        if not dry_run:
+            collection.bulk_write(batch, ordered=False)
+        converted += len(batch)
+
+    return converted, failed
+
+def migrate_datetimes(dry_run=False):
+    # Configuration
+    MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+    DB_NAME = os.environ.get('DB_NAME', 'test_database')
+
+    print(f"Starting datetime migration{' (dry run)' if dry_run else ''}...")
+    print(f"Database: {DB_NAME}")
+
+    client = MongoClient(MONGO_URL)
+    try:
+        db = client[DB_NAME]
+        total_failed = 0
+
+        for collection_name, fields in DATETIME_FIELDS.items():
+            converted, failed = migrate_collection(db[collection_name], fields, dry_run)
+            total_failed += failed
+            print(f"✓ {collection_name}: {converted} documents {'to convert' if dry_run else 'converted'}")
+
+        if total_failed:
+            print(f"\n❌ {total_failed} values could not be parsed; schema marker not set")
+            return False
+
+        if not dry_run:
+            db.schema_meta.update_one(
+                SCHEMA_MARKER,
+                {'$set': {'version': SCHEMA_VERSION, 'migrated_at': datetime.now(timezone.utc)}},
+                upsert=True
+            )
+            print(f"\n✅ Migration complete; schema marker set (restart the API to skip per-row parsing)")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ Migration failed: {str(e)}")
+        return False
+    finally:
+        client.close()
+
+if __name__ == '__main__':
+    # Load environment variables
+    from dotenv import load_dotenv
+    load_dotenv('/app/backend/.env')
+
+    ok = migrate_datetimes(dry_run='--dry-run' in sys.argv)
+    sys.exit(0 if ok else 1)
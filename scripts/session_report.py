@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Session Collection Report for House of Neelam E-Commerce
+Shows user_sessions size, expired-row counts and index health
+"""
+
+import os
+import json
+from datetime import datetime, timezone
+from pymongo import MongoClient
+
+EXPECTED_INDEXES = ['session_token_unique', 'user_id', 'expires_at_ttl']
+
+def session_report():
+    # Configuration
+    MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+    DB_NAME = os.environ.get('DB_NAME', 'test_database')
+
+    print(f"Session report for database: {DB_NAME}")
+
+    client = MongoClient(MONGO_URL)
+    try:
+        db = client[DB_NAME]
+        sessions = db.user_sessions
+        now = datetime.now(timezone.utc)
+
+        stats = db.command('collStats', 'user_sessions')
+        total = sessions.estimated_document_count()
+        expired_dates = sessions.count_documents({'expires_at': {'$type': 'date', '$lt': now}})
+        expired_strings = sessions.count_documents({'expires_at': {'$type': 'string', '$lt': now.isoformat()}})
+        string_rows = sessions.count_documents({'expires_at': {'$type': 'string'}})
+
+        indexes = sessions.index_information()
+        missing = [name for name in EXPECTED_INDEXES if name not in indexes]
+
+        report = {
+            'generated_at': now.isoformat(),
+            'database': DB_NAME,
+            'documents': total,
+            'data_size_bytes': stats.get('size', 0),
+            'storage_size_bytes': stats.get('storageSize', 0),
+            'index_size_bytes': stats.get('totalIndexSize', 0),
+            'expired': {
+                'awaiting_ttl_monitor': expired_dates,
+                'legacy_string_expiry': expired_strings
+            },
+            'legacy_string_rows': string_rows,
+            'indexes': sorted(indexes.keys()),
+            'missing_indexes': missing
+        }
+
+        print(f"\n📊 Documents: {total}")
+        print(f"   Data size: {report['data_size_bytes'] / 1024:.1f} KB, indexes: {report['index_size_bytes'] / 1024:.1f} KB")
+        print(f"⌛ Expired (date, pending TTL monitor): {expired_dates}")
+        print(f"⌛ Expired (legacy string expiry, pending sweeper): {expired_strings}")
+        print(f"📜 Rows with string expires_at: {string_rows}")
+        if missing:
+            print(f"⚠️  Missing indexes: {', '.join(missing)} (created on next server startup)")
+        else:
+            print(f"✓ All session indexes present")
+
+        return report
+
+    except Exception as e:
+        print(f"\n❌ Report failed: {str(e)}")
+        return None
+    finally:
+        client.close()
+
+if __name__ == '__main__':
+    import sys
+
+    # Load environment variables
+    from dotenv import load_dotenv
+    load_dotenv('/app/backend/.env')
+
+    report = session_report()
+
+    if report and '--json' in sys.argv:
+        print(json.dumps(report, indent=2))